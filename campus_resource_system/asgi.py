@@ -3,6 +3,11 @@ ASGI config for campus_resource_system project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the project through this entry point (e.g. ``uvicorn
+campus_resource_system.asgi:application``) to use the server-sent events
+stream at /api/events/bookings/: each open stream only holds a coroutine
+here, while under WSGI it would tie up a worker thread for its lifetime.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -45,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'resources.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -53,6 +57,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'resources.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'campus_resource_system.urls'
@@ -90,6 +95,30 @@ DATABASES = {
     }
 }
 
+# CAMPUS_DB=sqlite runs against a local SQLite file, e.g. for benchmarking
+# with generated data (see the generate_data and run_benchmark commands).
+if os.environ.get('CAMPUS_DB') == 'sqlite':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    }
+    # CAMPUS_DB_REPLICA=1 adds a second SQLite file as a stand-in replica
+    # (nothing copies rows into it; it only exercises the routing)
+    if os.environ.get('CAMPUS_DB_REPLICA'):
+        DATABASES['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db-replica.sqlite3',
+        }
+
+# Safe-method API reads go to these aliases (see resources/routers.py). A
+# client that just wrote gets a cookie pinning its reads to the primary for
+# REPLICA_PIN_SECONDS; an unreachable replica is skipped for
+# REPLICA_RETRY_SECONDS.
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['resources.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = 5
+REPLICA_RETRY_SECONDS = 30
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -136,20 +165,94 @@ AUTH_USER_MODEL = 'resources.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'resources.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'resources.renderers.CompactJSONRenderer', # ?format=compact
+    ),
 }
 
+# Bookings and user activity support opt-in cursor pagination (?page_size=).
+# Set to True once every client paginates to make it mandatory.
+CURSOR_PAGINATION_REQUIRED = False
+
 from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
 }
 
+# request.user is built from the token's role/status claims, which are
+# checked against the user's current role/status and rejected on mismatch.
+# That state is cached per user for AUTH_USER_STATE_TTL seconds and read
+# from the database on a miss, so with per-process caches a demotion or
+# deletion reaches every worker within that many seconds.
+AUTH_CLAIMS_REVOCATION_CHECK = True
+AUTH_USER_STATE_TTL = 30
+
+# Local memory is fine for a single process. Deployments with several
+# workers should point this at a shared backend (e.g. Redis or Memcached)
+# so cache version bumps are seen by every worker.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'campus-resource-system',
+    }
+}
+
+# Resource catalogue responses are cached until the next Resource write
+RESOURCE_CACHE_ALIAS = 'default'
+RESOURCE_CACHE_TIMEOUT = 3600
+
+# Dashboard counters are cached briefly so repeated loads stay cheap
+STATS_CACHE_TIMEOUT = 30
+
+# 'memory' serves /api/resources/search/ from an in-process index kept in
+# sync through resource_cache; 'database' uses a name prefix query instead
+RESOURCE_SEARCH_BACKEND = 'memory'
+
+# Availability matrices are invalidated by booking writes, the timeout only
+# bounds how long an unused entry lingers
+AVAILABILITY_CACHE_TIMEOUT = 300
+
+# Login/logout activity is buffered in memory and written in batches of
+# ACTIVITY_FLUSH_SIZE events or every ACTIVITY_FLUSH_INTERVAL seconds
+ACTIVITY_BUFFERED = True
+ACTIVITY_FLUSH_SIZE = 100
+ACTIVITY_FLUSH_INTERVAL = 5
+
+# Raw activity older than this is archived by `manage.py archive_user_activity`
+ACTIVITY_RETENTION_DAYS = 90
+
+# Per-route latency, DB, serializer and auth timings, exposed to staff at
+# /api/metrics/ and in Server-Timing headers
+METRICS_ENABLED = True
+
+# Processes used to hash passwords during bulk user imports (None: CPU count)
+USER_IMPORT_HASH_WORKERS = None
+
+# Booking create/status responses are replayed for repeated Idempotency-Key
+# headers for this long (keys are stored in the database); a duplicate
+# arriving while the first attempt is still running gets 409, until that
+# attempt is IDEMPOTENCY_LOCK_TIMEOUT seconds old and presumed dead
+IDEMPOTENCY_KEY_TTL = 86400
+IDEMPOTENCY_LOCK_TIMEOUT = 30
+
+# Booking events for /api/events/bookings/. The default broker only reaches
+# streams in the same process; swap in a shared one for multiple workers.
+BOOKING_EVENTS_BROKER = 'resources.events.InProcessBroker'
+BOOKING_EVENTS_KEEPALIVE = 15
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
 ]
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed', 'Retry-After']
+# The frontend sends cookies so the replica read pin reaches the API
+CORS_ALLOW_CREDENTIALS = True
 
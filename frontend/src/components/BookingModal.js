@@ -1,8 +1,11 @@
 import React, { useState, useEffect } from 'react';
-import { resourcesAPI, bookingsAPI } from '../services/api';
+import { resourcesAPI, bookingsAPI, availabilityAPI } from '../services/api';
 
 const BookingModal = ({ isOpen, onClose, onSuccess }) => {
   const [resources, setResources] = useState([]);
+  const [query, setQuery] = useState('');
+  const [takenSlots, setTakenSlots] = useState({}); // resource id -> bitmask for the chosen date
+  const [alternatives, setAlternatives] = useState([]); // offered by the API when a slot is taken
   const [formData, setFormData] = useState({
     resource: '', // ID
     booking_date: '',
@@ -22,15 +25,40 @@ const BookingModal = ({ isOpen, onClose, onSuccess }) => {
     "04:00 PM - 05:00 PM"
   ];
 
+  // Ranked search results instead of the whole catalogue; debounced while typing
   useEffect(() => {
-    if (isOpen) {
-      fetchResources();
+    if (!isOpen) return undefined;
+    const timer = setTimeout(() => fetchResources(query), 150);
+    return () => clearTimeout(timer);
+  }, [isOpen, query]);
+
+  useEffect(() => {
+    if (isOpen && formData.booking_date) {
+      fetchAvailability(formData.booking_date);
     }
-  }, [isOpen]);
+  }, [isOpen, formData.booking_date]);
 
-  const fetchResources = async () => {
+  const fetchAvailability = async (date) => {
     try {
-      const response = await resourcesAPI.getAll();
+      const response = await availabilityAPI.get({ from: date, to: date });
+      const taken = {};
+      response.data.resources.forEach((r) => {
+        taken[r.id] = r.taken[date] || 0;
+      });
+      setTakenSlots(taken);
+    } catch (error) {
+      console.error('Error fetching availability:', error);
+    }
+  };
+
+  const isSlotTaken = (index) => {
+    const mask = takenSlots[formData.resource] || 0;
+    return (mask & (1 << index)) !== 0;
+  };
+
+  const fetchResources = async (q) => {
+    try {
+      const response = await resourcesAPI.search({ q, status: 'AVAILABLE', limit: 50 });
       setResources(response.data);
     } catch (error) {
       console.error('Error fetching resources:', error);
@@ -44,10 +72,30 @@ const BookingModal = ({ isOpen, onClose, onSuccess }) => {
       onSuccess();
       onClose();
       setFormData({ resource: '', booking_date: '', time_slot: '', purpose: '' });
+      setAlternatives([]);
     } catch (error) {
       console.error('Error creating booking:', error);
-      alert('Failed to create booking');
+      const suggested = error.response?.data?.alternatives;
+      if (suggested && suggested.length) {
+        setAlternatives(suggested);
+      } else {
+        alert('Failed to create booking');
+      }
+    }
+  };
+
+  const chooseAlternative = (alternative) => {
+    // Other resources may not be among the current search results
+    if (!resources.some((r) => r.id === alternative.resource)) {
+      setResources([{ id: alternative.resource, name: alternative.resource_name, type: '' }, ...resources]);
     }
+    setFormData({
+      ...formData,
+      resource: String(alternative.resource),
+      booking_date: alternative.booking_date,
+      time_slot: alternative.time_slot,
+    });
+    setAlternatives([]);
   };
 
   if (!isOpen) return null;
@@ -67,6 +115,13 @@ const BookingModal = ({ isOpen, onClose, onSuccess }) => {
             <label className="block text-sm font-medium text-gray-700 mb-1">
               Resource
             </label>
+            <input
+              type="search"
+              value={query}
+              onChange={(e) => setQuery(e.target.value)}
+              placeholder="Search by name"
+              className="w-full mb-2 px-3 py-2 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500"
+            />
             <select
               value={formData.resource}
               onChange={(e) => setFormData({ ...formData, resource: e.target.value })}
@@ -106,9 +161,9 @@ const BookingModal = ({ isOpen, onClose, onSuccess }) => {
               required
             >
               <option value="">Select a time slot</option>
-              {TIME_SLOTS.map((slot) => (
-                <option key={slot} value={slot}>
-                  {slot}
+              {TIME_SLOTS.map((slot, index) => (
+                <option key={slot} value={slot} disabled={isSlotTaken(index)}>
+                  {slot}{isSlotTaken(index) ? ' (Booked)' : ''}
                 </option>
               ))}
             </select>
@@ -127,6 +182,24 @@ const BookingModal = ({ isOpen, onClose, onSuccess }) => {
             />
           </div>
 
+          {alternatives.length > 0 && (
+            <div className="p-3 bg-yellow-50 border border-yellow-200 rounded-lg">
+              <p className="text-sm text-gray-700 mb-2">That slot is already booked. Available instead:</p>
+              <div className="space-y-1">
+                {alternatives.map((alternative) => (
+                  <button
+                    key={`${alternative.resource}-${alternative.booking_date}-${alternative.time_slot}`}
+                    type="button"
+                    onClick={() => chooseAlternative(alternative)}
+                    className="block w-full text-left text-sm px-2 py-1 rounded hover:bg-yellow-100"
+                  >
+                    {alternative.resource_name} · {alternative.booking_date} · {alternative.time_slot}
+                  </button>
+                ))}
+              </div>
+            </div>
+          )}
+
           <div className="flex space-x-3">
             <button
               type="submit"
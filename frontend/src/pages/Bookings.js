@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react';
 import Layout from '../components/Layout';
 import BookingModal from '../components/BookingModal';
 import StatusBadge from '../components/StatusBadge';
-import { bookingsAPI } from '../services/api';
+import { bookingsAPI, eventsAPI } from '../services/api';
 import { useAuth } from '../context/AuthContext';
 
 const Bookings = () => {
@@ -15,6 +15,29 @@ const Bookings = () => {
     fetchBookings();
   }, []);
 
+  // Apply pushed changes in place instead of reloading the whole list
+  useEffect(() => {
+    const source = eventsAPI.bookings();
+    source.addEventListener('booking.status', (e) => {
+      const event = JSON.parse(e.data);
+      setBookings((current) => current.map((b) => (b.id === event.id ? { ...b, status: event.status } : b)));
+    });
+    source.addEventListener('booking.created', async (e) => {
+      const event = JSON.parse(e.data);
+      try {
+        const response = await bookingsAPI.getById(event.id);
+        setBookings((current) => (current.some((b) => b.id === event.id) ? current : [response.data, ...current]));
+      } catch (error) {
+        console.error('Error fetching new booking:', error);
+      }
+    });
+    return () => source.close();
+  }, []);
+
+  const updateStatus = (updated) => {
+    setBookings((current) => current.map((b) => (b.id === updated.id ? { ...b, status: updated.status } : b)));
+  };
+
   const fetchBookings = async () => {
     try {
       const response = await bookingsAPI.getAll();
@@ -28,8 +51,8 @@ const Bookings = () => {
 
   const handleApprove = async (id) => {
     try {
-      await bookingsAPI.approve(id);
-      fetchBookings();
+      const response = await bookingsAPI.approve(id);
+      updateStatus({ id, status: response.data.status });
     } catch (error) {
       console.error('Error approving booking:', error);
     }
@@ -37,8 +60,8 @@ const Bookings = () => {
 
   const handleReject = async (id) => {
     try {
-      await bookingsAPI.reject(id);
-      fetchBookings();
+      const response = await bookingsAPI.reject(id);
+      updateStatus({ id, status: response.data.status });
     } catch (error) {
       console.error('Error rejecting booking:', error);
     }
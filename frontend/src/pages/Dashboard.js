@@ -4,7 +4,7 @@ import StudentWelcome from '../components/StudentWelcome';
 import StaffWelcome from '../components/StaffWelcome';
 import AdminWelcome from '../components/AdminWelcome';
 import { useAuth } from '../context/AuthContext';
-import { bookingsAPI, resourcesAPI, usersAPI } from '../services/api';
+import { statsAPI } from '../services/api';
 
 const Dashboard = () => {
   const { user } = useAuth();
@@ -22,26 +22,15 @@ const Dashboard = () => {
 
   const fetchDashboardData = async () => {
     try {
-      const promises = [
-        bookingsAPI.getAll(),
-        resourcesAPI.getAll(),
-      ];
-
-      if (user?.role === 'staff') {
-        promises.push(usersAPI.getAll());
-      }
-
-      const responses = await Promise.all(promises);
-      const bookings = responses[0].data;
-      const resources = responses[1].data;
-      const users = responses[2]?.data || [];
+      // Counts are aggregated server-side and scoped to the user's role
+      const { data } = await statsAPI.get();
 
       setStats({
-        totalBookings: bookings.length,
-        pendingBookings: bookings.filter(b => b.status === 'pending').length,
-        approvedBookings: bookings.filter(b => b.status === 'approved').length,
-        totalResources: resources.length,
-        totalUsers: users.length,
+        totalBookings: data.bookings.total,
+        pendingBookings: data.bookings.PENDING,
+        approvedBookings: data.bookings.APPROVED,
+        totalResources: data.resources.total,
+        totalUsers: data.users?.total || 0,
       });
     } catch (error) {
       console.error('Error fetching dashboard data:', error);
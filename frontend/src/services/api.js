@@ -4,6 +4,8 @@ const API_BASE_URL = 'http://localhost:8000/api';
 
 const api = axios.create({
   baseURL: API_BASE_URL,
+  // Carries the read-your-writes cookie set after a write
+  withCredentials: true,
   headers: {
     'Content-Type': 'application/json',
   },
@@ -20,6 +22,21 @@ api.interceptors.request.use(
   (error) => Promise.reject(error)
 );
 
+// Sends one Idempotency-Key with every attempt and retries network errors
+// and "still processing" 409s, so a retried request can't book or approve twice
+const idempotent = async (send, attempts = 3) => {
+  const key = crypto.randomUUID();
+  for (let attempt = 1; ; attempt += 1) {
+    try {
+      return await send({ headers: { 'Idempotency-Key': key } });
+    } catch (error) {
+      const inProgress = error.response?.status === 409 && error.response.headers['retry-after'];
+      if ((error.response && !inProgress) || attempt >= attempts) throw error;
+      await new Promise((resolve) => setTimeout(resolve, 500 * attempt));
+    }
+  }
+};
+
 export const authAPI = {
   login: (credentials) => api.post('/auth/login/', credentials),
   logout: () => api.post('/auth/logout/'), // Added logout call
@@ -29,7 +46,7 @@ export const userActivityAPI = {
 };
 
 export const usersAPI = {
-  getAll: () => api.get('/users/'),
+  getAll: (params) => api.get('/users/', { params }), // role, status
   getById: (id) => api.get(`/users/${id}/`),
   create: (data) => api.post('/users/', data),
   update: (id, data) => api.put(`/users/${id}/`, data),
@@ -37,7 +54,8 @@ export const usersAPI = {
 };
 
 export const resourcesAPI = {
-  getAll: () => api.get('/resources/'),
+  getAll: (params) => api.get('/resources/', { params }), // type, status, capacity__gte, capacity__lte
+  search: (params) => api.get('/resources/search/', { params }), // q, type, min_capacity, status, limit
   getById: (id) => api.get(`/resources/${id}/`),
   create: (data) => api.post('/resources/', data),
   update: (id, data) => api.put(`/resources/${id}/`, data),
@@ -45,13 +63,30 @@ export const resourcesAPI = {
 };
 
 export const bookingsAPI = {
-  getAll: () => api.get('/bookings/'),
+  getAll: (params) => api.get('/bookings/', { params }), // status, resource, user, booking_date__gte, booking_date__lte
   getById: (id) => api.get(`/bookings/${id}/`),
-  create: (data) => api.post('/bookings/', data),
+  create: (data) => idempotent((config) => api.post('/bookings/', data, config)),
+  bulkCreate: (data) => api.post('/bookings/bulk/', data), // list of bookings or a recurrence rule
   update: (id, data) => api.put(`/bookings/${id}/`, data),
-  approve: (id) => api.patch(`/bookings/${id}/update_status/`, { status: 'APPROVED' }), // Fixed endpoint to match ViewSet action
-  reject: (id) => api.patch(`/bookings/${id}/update_status/`, { status: 'REJECTED' }), // Fixed endpoint to match ViewSet action
+  approve: (id) => idempotent((config) => api.patch(`/bookings/${id}/update_status/`, { status: 'APPROVED' }, config)), // Fixed endpoint to match ViewSet action
+  reject: (id) => idempotent((config) => api.patch(`/bookings/${id}/update_status/`, { status: 'REJECTED' }, config)), // Fixed endpoint to match ViewSet action
+  batchUpdateStatus: (ids, status) => api.patch('/bookings/batch_status/', { ids, status }),
   delete: (id) => api.delete(`/bookings/${id}/`),
 };
 
+export const statsAPI = {
+  get: () => api.get('/stats/'),
+};
+
+export const availabilityAPI = {
+  get: (params) => api.get('/availability/', { params }),
+};
+
+// Server-sent booking events; EventSource can't set headers, so the token goes in the query string
+export const eventsAPI = {
+  bookings: (params = {}) => new EventSource(
+    `${API_BASE_URL}/events/bookings/?${new URLSearchParams({ token: localStorage.getItem('token') || '', ...params })}`
+  ),
+};
+
 export default api;
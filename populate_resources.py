@@ -6,6 +6,7 @@ import django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'campus_resource_system.settings')
 django.setup()
 
+from resources.cache import resource_cache
 from resources.models import Resource
 
 def populate():
@@ -22,19 +23,16 @@ def populate():
     ]
 
     print("Seeding resources...")
+    existing = set(Resource.objects.filter(name__in=[r["name"] for r in resources]).values_list("name", flat=True))
+    missing = [r for r in resources if r["name"] not in existing]
+    Resource.objects.bulk_create([
+        Resource(name=r["name"], type=r["type"], capacity=r["capacity"], status="AVAILABLE")
+        for r in missing
+    ])
+    # bulk_create skips the post_save signal that invalidates cached listings
+    resource_cache.bump()
     for r in resources:
-        obj, created = Resource.objects.get_or_create(
-            name=r["name"],
-            defaults={
-                "type": r["type"],
-                "capacity": r["capacity"],
-                "status": "AVAILABLE"
-            }
-        )
-        if created:
-            print(f"Created: {r['name']}")
-        else:
-            print(f"Already exists: {r['name']}")
+        print(f"Already exists: {r['name']}" if r["name"] in existing else f"Created: {r['name']}")
     print("Done!")
 
 if __name__ == '__main__':
@@ -0,0 +1,116 @@
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import UserActivity
+
+logger = logging.getLogger(__name__)
+
+LOGIN = 'login'
+LOGOUT = 'logout'
+
+
+class ActivityRecorder:
+    """
+    Buffers login/logout events in memory and writes them in batches, so
+    the auth endpoints never wait on the UserActivity table.
+
+    A background thread flushes the buffer once it holds
+    ACTIVITY_FLUSH_SIZE events or ACTIVITY_FLUSH_INTERVAL seconds have
+    passed: logins become one bulk_create, logouts one bulk_update. With
+    ACTIVITY_BUFFERED = False every event is written straight away.
+
+    The buffer is per process; events still buffered when a worker is
+    killed without running atexit handlers are lost. With background=False
+    no thread is started and events wait for an explicit flush().
+    """
+
+    def __init__(self, background=True):
+        self.background = background
+        self._events = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def record_login(self, user_id, at=None):
+        self._record(LOGIN, user_id, at)
+
+    def record_logout(self, user_id, at=None):
+        self._record(LOGOUT, user_id, at)
+
+    def _record(self, kind, user_id, at):
+        with self._lock:
+            self._events.append((kind, user_id, at or timezone.now()))
+            pending = len(self._events)
+
+        if not getattr(settings, 'ACTIVITY_BUFFERED', True):
+            self.flush()
+            return
+        self._start()
+        if pending >= getattr(settings, 'ACTIVITY_FLUSH_SIZE', 100):
+            self._wakeup.set()
+
+    def _start(self):
+        if self._thread is not None or not self.background:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='activity-recorder', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(getattr(settings, 'ACTIVITY_FLUSH_INTERVAL', 5))
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to write buffered user activity")
+            finally:
+                connections.close_all()
+
+    def flush(self):
+        """Write every buffered event. Returns the number of events written."""
+        with self._lock:
+            events, self._events = self._events, []
+        if not events:
+            return 0
+
+        # Replay events in order against each user's open sessions (oldest
+        # first), so a logout always closes that user's latest open login
+        open_sessions = defaultdict(list)
+        logout_users = {user_id for kind, user_id, _ in events if kind == LOGOUT}
+        if logout_users:
+            rows = UserActivity.objects.filter(
+                user_id__in=logout_users, logout_time__isnull=True
+            ).only('id', 'user_id', 'login_time').order_by('login_time')
+            for row in rows:
+                open_sessions[row.user_id].append(row)
+
+        created = []
+        closed = []
+        for kind, user_id, at in events:
+            if kind == LOGIN:
+                row = UserActivity(user_id=user_id, login_time=at)
+                created.append(row)
+                open_sessions[user_id].append(row)
+            elif open_sessions[user_id]:
+                row = open_sessions[user_id].pop()
+                row.logout_time = at
+                if row.pk is not None:
+                    closed.append(row)
+
+        with transaction.atomic():
+            UserActivity.objects.bulk_create(created)
+            if closed:
+                UserActivity.objects.bulk_update(closed, ['logout_time'])
+        return len(events)
+
+
+activity_recorder = ActivityRecorder()
@@ -0,0 +1,202 @@
+"""
+Resource utilization analytics.
+
+ResourceDailyUsage keeps one row per (resource, date) with bitmasks of the
+approved and pending standard slots. Booking writes refresh just the rows
+they touch (refresh_usage), so a report over any range reads the rollup
+and never the Bookings table. backfill_usage() rebuilds it from scratch.
+"""
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count
+from django.db.models.functions import ExtractIsoWeekDay
+
+from .availability import slot_mask
+from .models import Resource, Booking, ResourceDailyUsage
+
+# Longest date range a single utilization report may cover
+UTILIZATION_MAX_DAYS = 366
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+# Tries per refresh_usage() call when concurrent refreshes collide
+_REFRESH_ATTEMPTS = 3
+
+_SLOT_COUNT = len(Booking.TIME_SLOTS)
+# Slot indexes set in each possible mask, so aggregating a mask is a table
+# lookup instead of a bit loop
+_MASK_SLOTS = [tuple(i for i in range(_SLOT_COUNT) if mask >> i & 1) for mask in range(1 << _SLOT_COUNT)]
+
+
+def _day_masks(rows):
+    """{(resource_id, date): [approved_mask, pending_mask]} from booking rows."""
+    masks = defaultdict(lambda: [0, 0])
+    for resource_id, booking_date, booking_status, start_time, end_time in rows:
+        masks[(resource_id, booking_date)][booking_status == 'PENDING'] |= slot_mask(start_time, end_time)
+    return masks
+
+
+def _live_bookings():
+    # Legacy slots that couldn't be parsed have no place on the grid
+    return Booking.objects.filter(
+        status__in=('APPROVED', 'PENDING'), start_time__isnull=False
+    ).order_by().values_list('resource_id', 'booking_date', 'status', 'start_time', 'end_time')
+
+
+def _replace_usage(keys):
+    rows = _live_bookings().filter(
+        resource_id__in={resource_id for resource_id, _ in keys},
+        booking_date__in={day for _, day in keys},
+    )
+    masks = _day_masks(row for row in rows if (row[0], row[1]) in keys)
+    with transaction.atomic():
+        # Matched in Python rather than with a long OR of (resource, date) pairs
+        current = ResourceDailyUsage.objects.filter(
+            resource_id__in={resource_id for resource_id, _ in keys},
+            date__in={day for _, day in keys},
+        ).values_list('id', 'resource_id', 'date')
+        ResourceDailyUsage.objects.filter(
+            id__in=[pk for pk, resource_id, day in current if (resource_id, day) in keys]
+        ).delete()
+        ResourceDailyUsage.objects.bulk_create([
+            ResourceDailyUsage(resource_id=resource_id, date=day, approved_mask=approved, pending_mask=pending)
+            for (resource_id, day), (approved, pending) in masks.items()
+            if approved | pending
+        ])
+
+
+def refresh_usage(keys):
+    """
+    Recompute the usage rows for the given (resource_id, date) pairs from
+    their bookings. Called after booking writes; bulk paths pass every
+    pair they touched (see signals.bookings_changed).
+
+    Rows are deleted and re-inserted rather than upserted: MySQL can't
+    upsert on a named unique constraint.
+    """
+    keys = {key for key in keys if None not in key}
+    if not keys:
+        return
+    for attempt in range(_REFRESH_ATTEMPTS):
+        try:
+            return _replace_usage(keys)
+        except IntegrityError:
+            # A concurrent refresh inserted one of these rows first; read
+            # the bookings again, they may have changed too
+            if attempt == _REFRESH_ATTEMPTS - 1:
+                raise
+
+
+def backfill_usage(since=None, until=None, batch_size=1000):
+    """
+    Rebuild ResourceDailyUsage for [since, until] (either bound optional)
+    from the Bookings table. Returns the number of rows written.
+    """
+    rows = _live_bookings()
+    existing = ResourceDailyUsage.objects.all()
+    if since:
+        rows = rows.filter(booking_date__gte=since)
+        existing = existing.filter(date__gte=since)
+    if until:
+        rows = rows.filter(booking_date__lte=until)
+        existing = existing.filter(date__lte=until)
+    masks = _day_masks(rows.iterator(chunk_size=5000))
+
+    with transaction.atomic():
+        existing.delete()
+        ResourceDailyUsage.objects.bulk_create([
+            ResourceDailyUsage(resource_id=resource_id, date=day, approved_mask=approved, pending_mask=pending)
+            for (resource_id, day), (approved, pending) in masks.items()
+            if approved | pending
+        ], batch_size=batch_size)
+    return sum(1 for approved, pending in masks.values() if approved | pending)
+
+
+def _weekday_counts(date_from, date_to):
+    # How many of each weekday (Mon=0) fall in the range
+    days = (date_to - date_from).days + 1
+    counts = [days // 7] * 7
+    for offset in range(days % 7):
+        counts[(date_from.weekday() + offset) % 7] += 1
+    return counts
+
+
+def _ratio(part, whole):
+    return round(part / whole, 4) if whole else 0.0
+
+
+def utilization_report(date_from, date_to, resource_type=None):
+    """
+    Weekday x slot occupancy heatmaps per resource and per resource type.
+
+    A resource's ``heatmap[w][i]`` is the share of weekday ``w`` dates in the
+    range on which slot ``i`` was approved (``pending`` likewise for pending
+    requests), and ``utilization`` the share of all its slots approved. Type
+    heatmaps weight each resource by ``capacity``, i.e. booked seat-hours
+    over offered seat-hours.
+    """
+    resources = Resource.objects.order_by('id')
+    usage = ResourceDailyUsage.objects.filter(date__range=(date_from, date_to))
+    if resource_type:
+        resources = resources.filter(type=resource_type)
+        usage = usage.filter(resource__type=resource_type)
+
+    weekday_days = _weekday_counts(date_from, date_to)
+    total_slots = sum(weekday_days) * _SLOT_COUNT
+
+    report = {}
+    for row in resources.values('id', 'name', 'type', 'capacity', 'status'):
+        row['approved'] = [[0] * _SLOT_COUNT for _ in WEEKDAYS]
+        row['pending'] = [[0] * _SLOT_COUNT for _ in WEEKDAYS]
+        report[row['id']] = row
+
+    # Days sharing a resource, weekday and pair of masks collapse into one
+    # counted row, so the database does most of the aggregation
+    grouped = usage.annotate(weekday=ExtractIsoWeekDay('date')).values(
+        'resource_id', 'weekday', 'approved_mask', 'pending_mask'
+    ).annotate(days=Count('id')).order_by()
+    for row in grouped:
+        entry = report.get(row['resource_id'])
+        if entry is None:
+            continue
+        weekday = row['weekday'] - 1
+        for kind in ('approved', 'pending'):
+            cells = entry[kind][weekday]
+            for slot in _MASK_SLOTS[row[f'{kind}_mask']]:
+                cells[slot] += row['days']
+
+    types = {}
+    for entry in report.values():
+        approved, pending = entry.pop('approved'), entry.pop('pending')
+        entry['heatmap'] = [[_ratio(n, weekday_days[w]) for n in cells] for w, cells in enumerate(approved)]
+        entry['pending'] = [[_ratio(n, weekday_days[w]) for n in cells] for w, cells in enumerate(pending)]
+        booked = sum(map(sum, approved))
+        entry['utilization'] = _ratio(booked, total_slots)
+
+        group = types.setdefault(entry['type'], {
+            'type': entry['type'], 'resources': 0, 'capacity': 0, 'booked_seat_hours': 0,
+            'seat_hours': [[0] * _SLOT_COUNT for _ in WEEKDAYS],
+        })
+        group['resources'] += 1
+        group['capacity'] += entry['capacity']
+        group['booked_seat_hours'] += booked * entry['capacity']
+        for w, cells in enumerate(approved):
+            for i, n in enumerate(cells):
+                group['seat_hours'][w][i] += n * entry['capacity']
+
+    for group in types.values():
+        seat_hours = group.pop('seat_hours')
+        group['heatmap'] = [[_ratio(n, weekday_days[w] * group['capacity']) for n in cells] for w, cells in enumerate(seat_hours)]
+        group['utilization'] = _ratio(group['booked_seat_hours'], total_slots * group['capacity'])
+
+    return {
+        'from': date_from.isoformat(),
+        'to': date_to.isoformat(),
+        'slots': Booking.TIME_SLOTS,
+        'weekdays': WEEKDAYS,
+        'days': dict(zip(WEEKDAYS, weekday_days)),
+        'resources': list(report.values()),
+        'types': sorted(types.values(), key=lambda group: group['type']),
+    }
+
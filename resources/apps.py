@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ResourcesConfig(AppConfig):
     name = 'resources'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from . import metrics  # noqa: F401 (instruments DB connections)
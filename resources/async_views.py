@@ -0,0 +1,113 @@
+"""
+Async versions of the hottest read endpoints, mounted under /api/async/.
+
+DRF views are sync only, so these are plain Django async views that reuse
+the serializers on rows fetched with the async ORM. Under ASGI a request
+waiting on the database or cache then holds a coroutine rather than a
+worker thread. They cover the common read paths only: the conditional
+GET, ?fields= and ?format= options of the DRF endpoints aren't offered.
+"""
+import functools
+
+from django.http import JsonResponse
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+
+from .authentication import aauthenticate
+from .availability import abuild_availability, AVAILABILITY_MAX_DAYS
+from .cache import resource_cache, cache_stats
+from .models import Resource, Booking
+from .serializers import ResourceSerializer, BookingSerializer
+from .stats import aget_dashboard_stats
+
+# Same ceiling as the cursor-paginated booking list
+ASYNC_MAX_LIMIT = 500
+
+
+def _error(detail, code):
+    return JsonResponse({"detail": detail}, status=code)
+
+
+def async_api_view(login_required=True):
+    """
+    Authenticate with the JWT (Authorization: Bearer) and pass the user to
+    the view, mirroring IsAuthenticated / AllowAny on the DRF endpoints.
+    """
+    def decorator(view):
+        @require_GET
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            try:
+                user = await aauthenticate(request)
+            except AuthenticationFailed as e:
+                detail = e.detail if isinstance(e.detail, dict) else {"detail": e.detail}
+                return JsonResponse(detail, status=status.HTTP_401_UNAUTHORIZED)
+            if user is None and login_required:
+                return _error("Authentication credentials were not provided.", status.HTTP_401_UNAUTHORIZED)
+            return await view(request, user, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@async_api_view(login_required=False)
+async def resource_list(request, user):
+    """The resource catalogue. Shares its cache entry with /api/resources/."""
+    async def build():
+        resources = [resource async for resource in Resource.objects.all()]
+        return ResourceSerializer(resources, many=True).data
+
+    # CachedReadMixin's key for a plain list, so either path can fill it
+    data = await resource_cache.aget_or_set('list::', build)
+    return JsonResponse(data, safe=False)
+
+
+@async_api_view()
+async def booking_list(request, user):
+    """
+    All bookings, newest first, with resource and user details joined in.
+    ?limit= returns at most that many (up to ASYNC_MAX_LIMIT) and
+    ?before=<id> continues from the last id of the previous page.
+    """
+    bookings = Booking.objects.select_related('user', 'resource').order_by('-id')
+    limit = request.GET.get('limit')
+    before = request.GET.get('before')
+    if before is not None:
+        if not before.isdigit():
+            return _error("'before' must be a booking id.", status.HTTP_400_BAD_REQUEST)
+        bookings = bookings.filter(id__lt=before)
+    if limit is not None:
+        if not limit.isdigit() or int(limit) < 1:
+            return _error("'limit' must be a positive integer.", status.HTTP_400_BAD_REQUEST)
+        bookings = bookings[:min(int(limit), ASYNC_MAX_LIMIT)]
+
+    rows = [booking async for booking in bookings]
+    return JsonResponse(BookingSerializer(rows, many=True).data, safe=False)
+
+
+@async_api_view()
+async def availability(request, user):
+    """Same parameters and payload as /api/availability/."""
+    try:
+        date_from = parse_date(request.GET.get('from', ''))
+        date_to = parse_date(request.GET.get('to', '')) if 'to' in request.GET else date_from
+    except ValueError:
+        date_from = date_to = None
+    if date_from is None or date_to is None:
+        return _error("'from' and 'to' must be dates in YYYY-MM-DD format.", status.HTTP_400_BAD_REQUEST)
+    if date_to < date_from:
+        return _error("'to' must not be before 'from'.", status.HTTP_400_BAD_REQUEST)
+    if (date_to - date_from).days >= AVAILABILITY_MAX_DAYS:
+        return _error(f"Date range cannot exceed {AVAILABILITY_MAX_DAYS} days.", status.HTTP_400_BAD_REQUEST)
+
+    return JsonResponse(await abuild_availability(date_from, date_to, request.GET.get('type')))
+
+
+@async_api_view()
+async def stats(request, user):
+    """Same payload as /api/stats/."""
+    data = await aget_dashboard_stats(user)
+    if user.role == 'STAFF':
+        data = {**data, 'cache': cache_stats()}
+    return JsonResponse(data)
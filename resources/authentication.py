@@ -0,0 +1,143 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .metrics import timed
+from .models import User
+
+# Claims copied into every token by CustomTokenObtainPairSerializer
+USER_CLAIMS = ('email', 'name', 'role', 'status')
+
+
+def user_state_key(user_id):
+    return f'auth:user-state:{user_id}'
+
+
+def remember_user_state(user, deleted=False):
+    """
+    Cache a user's current role/status (or that they were deleted) so this
+    worker refuses tokens with older claims straight away. Other workers
+    see the change once their own entry expires (AUTH_USER_STATE_TTL).
+    """
+    state = {'deleted': True} if deleted else {'role': user.role, 'status': user.status}
+    cache.set(user_state_key(user.pk), state, getattr(settings, 'AUTH_USER_STATE_TTL', 30))
+
+
+def user_state(user_id):
+    """A user's current role/status, from the cache or else the primary database."""
+    state = cache.get(user_state_key(user_id))
+    if state is None:
+        # Read the primary: a lagging replica could still hold the old role
+        row = User.objects.using(DEFAULT_DB_ALIAS).filter(pk=user_id).values('role', 'status').first()
+        state = row or {'deleted': True}
+        cache.set(user_state_key(user_id), state, getattr(settings, 'AUTH_USER_STATE_TTL', 30))
+    return state
+
+
+class ClaimsUser(TokenUser):
+    """
+    Request user built from token claims instead of a Users row.
+
+    It exposes what views and permissions read (id, email, name, role,
+    status, is_staff) and compares equal to the User it stands for.
+    """
+
+    @cached_property
+    def id(self):
+        # simplejwt stores the id claim as a string
+        return int(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def pk(self):
+        return self.id
+
+    @cached_property
+    def email(self):
+        return self.token.get('email', '')
+
+    @cached_property
+    def name(self):
+        return self.token.get('name', '')
+
+    @cached_property
+    def role(self):
+        return self.token.get('role')
+
+    @cached_property
+    def status(self):
+        return self.token.get('status')
+
+    @cached_property
+    def is_staff(self):
+        return self.role == 'STAFF'
+
+    @property
+    def is_active_user(self):
+        return self.status == 'ACTIVE'
+
+    def __eq__(self, other):
+        if isinstance(other, TokenUser) or hasattr(other, '_meta'):
+            return self.pk == other.pk
+        return NotImplemented
+
+    __hash__ = TokenUser.__hash__
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that resolves the user from the token's claims, so
+    authenticated requests don't load the Users row.
+
+    With AUTH_CLAIMS_REVOCATION_CHECK on, the user's current role/status
+    (see user_state(), cached for AUTH_USER_STATE_TTL seconds and loaded
+    from the database on a miss) is compared to the claims, and tokens
+    whose role/status no longer match are rejected. Tokens issued before
+    the claims existed fall back to the database lookup.
+    """
+
+    def authenticate(self, request):
+        with timed('auth_seconds'):
+            return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if any(claim not in validated_token for claim in USER_CLAIMS):
+            return super().get_user(validated_token)
+
+        user = ClaimsUser(validated_token)
+        if getattr(settings, 'AUTH_CLAIMS_REVOCATION_CHECK', True):
+            state = user_state(user.pk)
+            if state.get('deleted'):
+                raise AuthenticationFailed("User not found", code="user_not_found")
+            if state['role'] != user.role or state['status'] != user.status:
+                raise AuthenticationFailed("Token is out of date, please log in again.", code="token_not_valid")
+        return user
+
+
+async def aauthenticate(request, allow_query_token=False):
+    """
+    Authenticate a plain (non-DRF) async view with ClaimsJWTAuthentication.
+    Returns the user, or None when no token was sent; raises
+    AuthenticationFailed for a bad one. `allow_query_token` also accepts
+    ?token=, for clients such as EventSource that can't send headers.
+    """
+    with timed('auth_seconds'):
+        return await _aauthenticate(request, allow_query_token)
+
+
+async def _aauthenticate(request, allow_query_token):
+    auth = ClaimsJWTAuthentication()
+    raw_token = request.GET.get('token') if allow_query_token else None
+    if not raw_token:
+        header = auth.get_header(request)
+        raw_token = header and auth.get_raw_token(header)
+    if not raw_token:
+        return None
+    validated = auth.get_validated_token(raw_token)
+    # May read the Users table on a user state cache miss, or for older tokens
+    return await sync_to_async(auth.get_user)(validated)
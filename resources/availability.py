@@ -0,0 +1,187 @@
+import datetime
+import heapq
+
+from django.conf import settings
+from django.utils import timezone
+
+from .cache import VersionedCache
+from .models import Resource, Booking
+from .timeslots import parse_time_slot
+
+# Longest date range a single availability request may cover
+AVAILABILITY_MAX_DAYS = 62
+
+# How many days either side of a conflicting request to search, and how
+# many alternatives to offer
+ALTERNATIVE_DAYS = 3
+ALTERNATIVES_LIMIT = 5
+
+availability_cache = VersionedCache(
+    'availability', timeout=getattr(settings, 'AVAILABILITY_CACHE_TIMEOUT', 300)
+)
+
+_SLOT_INTERVALS = [(1 << i, *parse_time_slot(slot)) for i, slot in enumerate(Booking.TIME_SLOTS)]
+
+
+def slot_mask(start_time, end_time):
+    """Bitmask of the standard slots that overlap [start_time, end_time)."""
+    mask = 0
+    for bit, slot_start, slot_end in _SLOT_INTERVALS:
+        if start_time < slot_end and slot_start < end_time:
+            mask |= bit
+    return mask
+
+
+def _availability_queries(date_from, date_to, resource_type):
+    resources = Resource.objects.order_by('id')
+    bookings = Booking.objects.filter(
+        booking_date__range=(date_from, date_to)
+    ).exclude(status='REJECTED')
+    if resource_type:
+        resources = resources.filter(type=resource_type)
+        bookings = bookings.filter(resource__type=resource_type)
+    # One pass over (resource, booking_date, start_time), which is covered by
+    # the interval index
+    return (
+        resources.values('id', 'name', 'type', 'capacity', 'status'),
+        bookings.order_by().values_list('resource_id', 'booking_date', 'time_slot', 'start_time', 'end_time'),
+    )
+
+
+def _assemble_availability(date_from, date_to, resource_rows, booking_rows):
+    matrix = {}
+    for row in resource_rows:
+        row['taken'] = {}
+        matrix[row['id']] = row
+
+    for resource_id, booking_date, time_slot, start_time, end_time in booking_rows:
+        entry = matrix.get(resource_id)
+        if entry is None:
+            continue
+        day = booking_date.isoformat()
+        if start_time is not None:
+            mask = slot_mask(start_time, end_time)
+            if mask:
+                entry['taken'][day] = entry['taken'].get(day, 0) | mask
+        else:
+            # Legacy slots that couldn't be parsed can't be placed on the grid
+            entry.setdefault('other', {}).setdefault(day, []).append(time_slot)
+
+    return {
+        'from': date_from.isoformat(),
+        'to': date_to.isoformat(),
+        'slots': Booking.TIME_SLOTS,
+        'resources': list(matrix.values()),
+    }
+
+
+def _compute_availability(date_from, date_to, resource_type):
+    resources, bookings = _availability_queries(date_from, date_to, resource_type)
+    return _assemble_availability(date_from, date_to, resources, bookings)
+
+
+async def _acompute_availability(date_from, date_to, resource_type):
+    resources, bookings = _availability_queries(date_from, date_to, resource_type)
+    resource_rows = [row async for row in resources]
+    booking_rows = [row async for row in bookings]
+    return _assemble_availability(date_from, date_to, resource_rows, booking_rows)
+
+
+def _availability_key(date_from, date_to, resource_type):
+    return f'{date_from.isoformat()}:{date_to.isoformat()}:{resource_type or "*"}'
+
+
+def build_availability(date_from, date_to, resource_type=None):
+    """
+    Per-resource availability bitmaps for a date range.
+
+    Each resource carries a ``taken`` map of ISO date -> bitmask, where bit i
+    is set when a requested or approved booking overlaps ``slots[i]``. Dates
+    with no bookings are omitted, so an absent date means every slot is
+    free. Legacy bookings whose slot text couldn't be parsed are listed
+    verbatim under ``other``.
+
+    Results are cached until the next booking or resource write.
+    """
+    return availability_cache.get_or_set(
+        _availability_key(date_from, date_to, resource_type),
+        lambda: _compute_availability(date_from, date_to, resource_type),
+    )
+
+
+async def abuild_availability(date_from, date_to, resource_type=None):
+    """build_availability() using the async ORM and cache API."""
+    return await availability_cache.aget_or_set(
+        _availability_key(date_from, date_to, resource_type),
+        lambda: _acompute_availability(date_from, date_to, resource_type),
+    )
+
+
+def _slot_run_text(mask):
+    # "09:00 AM - 11:00 AM" for the standard slots set in mask
+    slots = [slot for bit, slot in enumerate(Booking.TIME_SLOTS) if mask >> bit & 1]
+    return f"{slots[0].split(' - ')[0]} - {slots[-1].split(' - ')[1]}"
+
+
+def suggest_alternatives(resource, booking_date, start_time, end_time, limit=ALTERNATIVES_LIMIT):
+    """
+    Free alternatives to a conflicting request, best first: the same
+    resource at the nearest free run of as many standard slots on the same
+    or nearby days, and other available resources of the same type with at
+    least its capacity at the requested date and slots. Nothing is offered
+    in the past, including slots that have already started today.
+
+    Reads one build_availability() grid (cached, usually already warm) and
+    ranks every candidate in a single pass over it.
+    """
+    wanted = slot_mask(start_time, end_time)
+    if not wanted:
+        return []
+    today = timezone.localdate()
+    date_from = max(booking_date - datetime.timedelta(days=ALTERNATIVE_DAYS), today)
+    date_to = booking_date + datetime.timedelta(days=ALTERNATIVE_DAYS)
+    if date_to < date_from:
+        return []
+
+    full = (1 << len(Booking.TIME_SLOTS)) - 1
+    width = bin(wanted).count('1')
+    # The requested slots moved n slots earlier or later, where they still fit the day
+    shifts = []
+    for n in range(1 - len(Booking.TIME_SLOTS), len(Booking.TIME_SLOTS)):
+        mask = wanted << n if n >= 0 else wanted >> -n
+        if mask & full == mask and bin(mask).count('1') == width:
+            shifts.append((abs(n), mask))
+    days = [date_from + datetime.timedelta(days=offset) for offset in range((date_to - date_from).days + 1)]
+    # Slots that have already started today can't be offered
+    now = timezone.localtime().time()
+    started = {today: sum(bit for bit, slot_start, _ in _SLOT_INTERVALS if slot_start <= now)}
+
+    # (cost, capacity, resource id, date, mask, reason): a slot moved by one
+    # costs 1, another resource at the same time 2, a day further away 10
+    candidates = []
+    grid = build_availability(date_from, date_to, resource.type)
+    for row in grid['resources']:
+        if row['status'] != 'AVAILABLE':
+            continue
+        if row['id'] == resource.pk:
+            for day in days:
+                taken = row['taken'].get(day.isoformat(), 0) | started.get(day, 0)
+                distance = abs((day - booking_date).days)
+                for moved, mask in shifts:
+                    if (moved or distance) and not taken & mask:
+                        reason = 'nearby_slot' if not distance else 'nearby_date'
+                        candidates.append((distance * 10 + moved, row['capacity'], row['id'], day, mask, reason, row['name']))
+        elif row['capacity'] >= resource.capacity and booking_date >= today:
+            if not (row['taken'].get(booking_date.isoformat(), 0) | started.get(booking_date, 0)) & wanted:
+                candidates.append((2, row['capacity'], row['id'], booking_date, wanted, 'similar_resource', row['name']))
+
+    return [
+        {
+            'resource': resource_id,
+            'resource_name': name,
+            'booking_date': day.isoformat(),
+            'time_slot': _slot_run_text(mask),
+            'reason': reason,
+        }
+        for _, _, resource_id, day, mask, reason, name in heapq.nsmallest(limit, candidates, key=lambda c: c[:5])
+    ]
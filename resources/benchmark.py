@@ -0,0 +1,377 @@
+"""
+Synthetic data and a repeatable load scenario for the main API endpoints.
+
+Used by the generate_data and run_benchmark management commands. Meant for
+a throwaway database, e.g. SQLite via CAMPUS_DB=sqlite.
+"""
+import asyncio
+import datetime
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections, transaction
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .cache import resource_cache
+from .models import User, Resource, Booking, UserActivity
+from .serializers import CustomTokenObtainPairSerializer
+from .signals import bookings_changed, users_changed
+from .timeslots import parse_time_slot
+
+BENCH_EMAIL_DOMAIN = 'bench.example.com'
+BENCH_RESOURCE_PREFIX = 'Bench '
+BENCH_PASSWORD = 'bench-password'
+RESOURCE_TYPES = ['Lab', 'Classroom', 'Event Hall', 'Study Room']
+
+
+def clear_data():
+    """Delete everything generate_data() created (bookings and activity cascade)."""
+    User.objects.filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}').delete()
+    Resource.objects.filter(name__startswith=BENCH_RESOURCE_PREFIX).delete()
+
+
+def generate_data(users=1000, resources=100, bookings=10000, activity=10000, days=90, seed=0, batch_size=1000):
+    """
+    Bulk-insert synthetic users, resources, bookings and activity rows.
+
+    Every user shares one password hash (BENCH_PASSWORD) so generation isn't
+    dominated by hashing. Bookings land on free (resource, date, slot)
+    triples within `days` days from today. Returns the row counts created.
+    """
+    rng = random.Random(seed)
+    clear_data()
+    password = make_password(BENCH_PASSWORD)
+    today = timezone.localdate()
+    now = timezone.now()
+
+    with transaction.atomic():
+        staff_count = max(1, users // 20)
+        User.objects.bulk_create([
+            User(
+                email=f'user{i}@{BENCH_EMAIL_DOMAIN}',
+                name=f'Bench User {i}',
+                password=password,
+                role='STAFF' if i < staff_count else 'STUDENT',
+            )
+            for i in range(users)
+        ], batch_size=batch_size)
+        Resource.objects.bulk_create([
+            Resource(
+                name=f'{BENCH_RESOURCE_PREFIX}{RESOURCE_TYPES[i % len(RESOURCE_TYPES)]} {i}',
+                type=RESOURCE_TYPES[i % len(RESOURCE_TYPES)],
+                capacity=rng.choice([10, 20, 30, 50, 100, 300]),
+            )
+            for i in range(resources)
+        ], batch_size=batch_size)
+
+        user_ids = list(User.objects.filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}').values_list('id', flat=True))
+        resource_ids = list(Resource.objects.filter(name__startswith=BENCH_RESOURCE_PREFIX).values_list('id', flat=True))
+        slots = [(slot, *parse_time_slot(slot)) for slot in Booking.TIME_SLOTS]
+
+        # Cap at the number of distinct triples available
+        bookings = min(bookings, len(resource_ids) * days * len(slots))
+        taken = set()
+        rows = []
+        while len(rows) < bookings:
+            key = (rng.choice(resource_ids), rng.randrange(days), rng.randrange(len(slots)))
+            if key in taken:
+                continue
+            taken.add(key)
+            slot, start_time, end_time = slots[key[2]]
+            rows.append(Booking(
+                user_id=rng.choice(user_ids),
+                resource_id=key[0],
+                booking_date=today + datetime.timedelta(days=key[1]),
+                time_slot=slot,
+                start_time=start_time,
+                end_time=end_time,
+                status=rng.choices(['PENDING', 'APPROVED', 'REJECTED'], weights=[5, 4, 1])[0],
+            ))
+        Booking.objects.bulk_create(rows, batch_size=batch_size)
+
+        sessions = []
+        for _ in range(activity):
+            login_time = now - datetime.timedelta(minutes=rng.randrange(days * 24 * 60))
+            logout_time = login_time + datetime.timedelta(minutes=rng.randrange(5, 240))
+            sessions.append(UserActivity(
+                user_id=rng.choice(user_ids),
+                login_time=login_time,
+                logout_time=logout_time if logout_time < now else None,
+            ))
+        UserActivity.objects.bulk_create(sessions, batch_size=batch_size)
+
+    # bulk_create skips model signals
+    bookings_changed({(row.resource_id, row.booking_date) for row in rows})
+    users_changed()
+    resource_cache.bump()
+    return {'users': users, 'resources': resources, 'bookings': len(rows), 'activity': activity}
+
+
+REPORT_COLUMNS = [
+    'scenario', 'requests', 'errors', 'p50_ms', 'p50_off_ms', 'p95_ms', 'p99_ms', 'throughput_rps',
+    'avg_queries', 'max_queries', 'overhead_ms', 'within_budget',
+]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(name, samples, elapsed, error_status=500):
+    latencies = sorted(sample['ms'] for sample in samples)
+    queries = [sample['queries'] for sample in samples]
+    return {
+        'scenario': name,
+        'requests': len(samples),
+        'errors': sum(1 for sample in samples if sample['status'] >= error_status),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        'avg_queries': round(sum(queries) / len(queries), 2) if queries else 0,
+        'max_queries': max(queries, default=0),
+    }
+
+
+class LoadScenario:
+    """
+    Replays a fixed, seeded mix of requests against the generated data
+    in-process (no network), timing each request and counting its queries.
+
+    Scenarios: login, bookings_list, booking_create, availability,
+    resource_search and approval. Login is run fewer times since it is
+    dominated by password hashing.
+    """
+
+    def __init__(self, iterations=200, login_iterations=5, seed=0):
+        self.iterations = iterations
+        self.login_iterations = login_iterations
+        self.rng = random.Random(seed)
+        self.today = timezone.localdate()
+
+    def client_for(self, user):
+        client = APIClient(SERVER_NAME='localhost')
+        token = CustomTokenObtainPairSerializer.get_token(user).access_token
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return client
+
+    def measure(self, send):
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = send()
+            ms = (time.perf_counter() - start) * 1000
+        return {'ms': ms, 'queries': len(ctx), 'status': response.status_code}
+
+    def run(self):
+        users = User.objects.filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}')
+        student = users.filter(role='STUDENT').first()
+        staff = users.filter(role='STAFF').first()
+        if student is None or staff is None:
+            raise RuntimeError("No benchmark data found, run generate_data first.")
+        resource_ids = list(Resource.objects.filter(name__startswith=BENCH_RESOURCE_PREFIX).values_list('id', flat=True))
+        student_client = self.client_for(student)
+        staff_client = self.client_for(staff)
+        anonymous = APIClient(SERVER_NAME='localhost')
+
+        def login():
+            return anonymous.post('/api/auth/login/', {'email': student.email, 'password': BENCH_PASSWORD}, format='json')
+
+        def bookings_list():
+            return student_client.get('/api/bookings/?page_size=50')
+
+        def booking_create():
+            return student_client.post('/api/bookings/', {
+                'resource': self.rng.choice(resource_ids),
+                'booking_date': (self.today + datetime.timedelta(days=self.rng.randrange(90, 180))).isoformat(),
+                'time_slot': self.rng.choice(Booking.TIME_SLOTS),
+            }, format='json')
+
+        def availability():
+            start = self.today + datetime.timedelta(days=self.rng.randrange(30))
+            return student_client.get('/api/availability/', {
+                'from': start.isoformat(),
+                'to': (start + datetime.timedelta(days=6)).isoformat(),
+                'type': self.rng.choice(RESOURCE_TYPES),
+            })
+
+        search_terms = ['bench', 'lab', 'clas', 'study r', 'lecure', 'hal']
+
+        def resource_search():
+            return student_client.get('/api/resources/search/', {
+                'q': self.rng.choice(search_terms),
+                'min_capacity': self.rng.choice([0, 20, 50]),
+            })
+
+        pending = list(Booking.objects.filter(
+            status='PENDING', resource_id__in=resource_ids
+        ).values_list('id', flat=True)[:self.iterations])
+
+        def approval():
+            booking_id = pending.pop() if pending else 0
+            return staff_client.patch(f'/api/bookings/{booking_id}/update_status/', {'status': 'APPROVED'}, format='json')
+
+        plan = [
+            ('login', login, self.login_iterations),
+            ('bookings_list', bookings_list, self.iterations),
+            ('booking_create', booking_create, self.iterations),
+            ('availability', availability, self.iterations),
+            ('resource_search', resource_search, self.iterations),
+            ('approval', approval, min(self.iterations, len(pending))),
+        ]
+        report = []
+        for name, send, count in plan:
+            samples = []
+            start = time.perf_counter()
+            for _ in range(count):
+                samples.append(self.measure(send))
+            report.append(summarize(name, samples, time.perf_counter() - start))
+        return report
+
+
+class SyncAsyncComparison:
+    """
+    Runs the same read requests through the sync DRF endpoints (WSGI
+    handler, one thread per worker) and the /api/async/ endpoints (ASGI
+    handler, one coroutine per worker on a single event loop) at the same
+    concurrency, and reports latency percentiles and throughput for each.
+
+    This is in-process, so it compares the request paths rather than the
+    servers; for deployment numbers, run gunicorn with N threads against
+    uvicorn with N concurrent connections on the same data.
+    """
+    ENDPOINTS = [
+        ('resources', '/api/resources/', '/api/async/resources/'),
+        ('bookings', '/api/bookings/?page_size=50', '/api/async/bookings/?limit=50'),
+        ('availability', '/api/availability/?from={start}&to={end}', '/api/async/availability/?from={start}&to={end}'),
+        ('stats', '/api/stats/', '/api/async/stats/'),
+    ]
+
+    def __init__(self, concurrency=8, requests_per_worker=25):
+        self.concurrency = concurrency
+        self.requests_per_worker = requests_per_worker
+        start = timezone.localdate()
+        self.params = {'start': start.isoformat(), 'end': (start + datetime.timedelta(days=6)).isoformat()}
+
+    def headers(self):
+        student = User.objects.filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}', role='STUDENT').first()
+        if student is None:
+            raise RuntimeError("No benchmark data found, run generate_data first.")
+        token = CustomTokenObtainPairSerializer.get_token(student).access_token
+        return {'authorization': f'Bearer {token}'}
+
+    def run_sync(self, url, headers):
+        def worker():
+            client = Client()
+            samples = []
+            try:
+                for _ in range(self.requests_per_worker):
+                    start = time.perf_counter()
+                    response = client.get(url, headers=headers)
+                    samples.append({'ms': (time.perf_counter() - start) * 1000, 'queries': 0, 'status': response.status_code})
+            finally:
+                connections.close_all()
+            return samples
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            futures = [pool.submit(worker) for _ in range(self.concurrency)]
+            samples = [sample for future in futures for sample in future.result()]
+        return samples, time.perf_counter() - start
+
+    def run_async(self, url, headers):
+        async def worker():
+            client = AsyncClient()
+            samples = []
+            for _ in range(self.requests_per_worker):
+                start = time.perf_counter()
+                response = await client.get(url, headers=headers)
+                samples.append({'ms': (time.perf_counter() - start) * 1000, 'queries': 0, 'status': response.status_code})
+            return samples
+
+        async def main():
+            start = time.perf_counter()
+            results = await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+            return [sample for samples in results for sample in samples], time.perf_counter() - start
+
+        return asyncio.run(main())
+
+    def run(self):
+        headers = self.headers()
+        report = []
+        # The async test client always sends Host: testserver
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for name, sync_url, async_url in self.ENDPOINTS:
+                report.extend(self.run_endpoint(name, sync_url, async_url, headers))
+        return report
+
+    def run_endpoint(self, name, sync_url, async_url, headers):
+        report = []
+        for mode, url, runner in (('wsgi', sync_url, self.run_sync), ('asgi', async_url, self.run_async)):
+            samples, elapsed = runner(url.format(**self.params), headers)
+            # Every request here should succeed, so count 4xx as errors too
+            row = summarize(f'{name} ({mode})', samples, elapsed, error_status=400)
+            # Query counts aren't captured across threads
+            del row['avg_queries'], row['max_queries']
+            report.append(row)
+        return report
+
+
+class MetricsOverhead:
+    """
+    Measures what MetricsMiddleware and the timing hooks add per request by
+    interleaving the same requests with METRICS_ENABLED on and off.
+    Reports the mean difference against BUDGET_MS, alongside both medians.
+    """
+    ENDPOINTS = [
+        ('bookings_list', '/api/bookings/?page_size=50'),
+        ('resources', '/api/resources/'),
+        ('resource_search', '/api/resources/search/?q=lab'),
+    ]
+    BUDGET_MS = 0.5
+
+    def __init__(self, iterations=200):
+        self.iterations = iterations
+
+    def run(self):
+        student = User.objects.filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}', role='STUDENT').first()
+        if student is None:
+            raise RuntimeError("No benchmark data found, run generate_data first.")
+        client = LoadScenario().client_for(student)
+        report = []
+        for name, url in self.ENDPOINTS:
+            timings = {True: [], False: []}
+            for i in range(self.iterations * 2):
+                enabled = i % 2 == 0
+                with override_settings(METRICS_ENABLED=enabled):
+                    start = time.perf_counter()
+                    client.get(url)
+                    timings[enabled].append((time.perf_counter() - start) * 1000)
+            on, off = sorted(timings[True]), sorted(timings[False])
+            mean = sum(on) / len(on) - sum(off) / len(off)
+            report.append({
+                'scenario': name,
+                'requests': len(on) + len(off),
+                'p50_ms': round(percentile(on, 50), 3),
+                'p50_off_ms': round(percentile(off, 50), 3),
+                'overhead_ms': round(mean, 3),
+                'within_budget': mean <= self.BUDGET_MS,
+            })
+        return report
+
+
+def format_report(report):
+    columns = [column for column in REPORT_COLUMNS if column in report[0]]
+    widths = {column: max(len(column), *(len(str(row[column])) for row in report)) for column in columns}
+    lines = ['  '.join(column.ljust(widths[column]) for column in columns)]
+    for row in report:
+        lines.append('  '.join(str(row[column]).ljust(widths[column]) for column in columns))
+    return '\n'.join(lines)
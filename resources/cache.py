@@ -0,0 +1,148 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .routers import primary_reads
+
+_registry = []
+
+
+class VersionedCache:
+    """
+    A cache namespace that is invalidated in one step by bumping a version
+    counter, instead of tracking and deleting every derived key.
+
+    Versions are millisecond timestamps, so a counter that gets evicted is
+    re-created with a value that can never collide with an older one.
+
+    `alias` picks the backend from CACHES: local memory is enough for a
+    single process, while multi-worker deployments need a shared backend so
+    every worker sees the same version. Hit/miss counters are per process.
+    """
+
+    def __init__(self, namespace, timeout=None, alias='default'):
+        self.namespace = namespace
+        self.timeout = timeout
+        self.alias = alias
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def version_key(self):
+        return f'{self.namespace}:version'
+
+    @staticmethod
+    def _next_version(current=None):
+        now = int(time.time() * 1000)
+        if current is not None and current >= now:
+            return current + 1
+        return now
+
+    def get_version(self):
+        version = self.cache.get(self.version_key)
+        if version is None:
+            self.cache.add(self.version_key, self._next_version(), None)
+            version = self.cache.get(self.version_key)
+        return version
+
+    def bump(self):
+        version = self._next_version(self.cache.get(self.version_key))
+        self.cache.set(self.version_key, version, None)
+        return version
+
+    def make_key(self, key):
+        return self._versioned_key(self.get_version(), key)
+
+    def _versioned_key(self, version, key):
+        # Keys carry user input (query strings, resource types); hash anything
+        # memcached would reject for spaces, control characters or length.
+        if len(key) > 200 or any(ord(char) <= 32 or ord(char) == 127 for char in key):
+            key = hashlib.md5(key.encode()).hexdigest()
+        return f'{self.namespace}:{version}:{key}'
+
+    def _count(self, value):
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def get(self, key, version=None):
+        version = self.get_version() if version is None else version
+        return self._count(self.cache.get(self._versioned_key(version, key)))
+
+    def set(self, key, value, version=None):
+        """
+        Pass the `version` read before building `value`, so a write that
+        commits meanwhile can't leave it cached under the newer version.
+        """
+        version = self.get_version() if version is None else version
+        self.cache.set(self._versioned_key(version, key), value, self.timeout)
+
+    def get_or_set(self, key, builder):
+        version = self.get_version()
+        value = self.get(key, version)
+        if value is None:
+            # Cached under the current version, so it must not lag behind it
+            with primary_reads():
+                value = builder()
+            self.set(key, value, version)
+        return value
+
+    # Async counterparts for the async views, using the backend's a* methods
+
+    async def aget_version(self):
+        version = await self.cache.aget(self.version_key)
+        if version is None:
+            await self.cache.aadd(self.version_key, self._next_version(), None)
+            version = await self.cache.aget(self.version_key)
+        return version
+
+    async def aget(self, key, version=None):
+        version = await self.aget_version() if version is None else version
+        return self._count(await self.cache.aget(self._versioned_key(version, key)))
+
+    async def aset(self, key, value, version=None):
+        version = await self.aget_version() if version is None else version
+        await self.cache.aset(self._versioned_key(version, key), value, self.timeout)
+
+    async def aget_or_set(self, key, builder):
+        """Like get_or_set, but `builder` is a coroutine function."""
+        version = await self.aget_version()
+        value = await self.aget(key, version)
+        if value is None:
+            with primary_reads():
+                value = await builder()
+            await self.aset(key, value, version)
+        return value
+
+
+def cache_stats():
+    """Per-process hit/miss counters for every versioned cache."""
+    return {
+        entry.namespace: {'hits': entry.hits, 'misses': entry.misses}
+        for entry in _registry
+    }
+
+
+# Resource catalogue responses, invalidated by any Resource write
+resource_cache = VersionedCache(
+    'resources',
+    timeout=getattr(settings, 'RESOURCE_CACHE_TIMEOUT', 3600),
+    alias=getattr(settings, 'RESOURCE_CACHE_ALIAS', 'default'),
+)
+
+# Version counters for tables served by list endpoints, used as cheap
+# validators for conditional GETs. Bumped from signals.py.
+booking_versions = VersionedCache('bookings')
+user_versions = VersionedCache('users')
@@ -0,0 +1,139 @@
+"""
+Booking change events for the server-sent events stream.
+
+Views publish through `publish_bookings()` once their transaction commits;
+the SSE view (`booking_events` in views.py) subscribes with a filter. The
+default broker is in-process, so it only reaches clients connected to the
+same ASGI worker. Point BOOKING_EVENTS_BROKER at another class with the
+same subscribe/unsubscribe/publish methods (e.g. one backed by Redis
+pub/sub) to fan out across workers.
+"""
+import asyncio
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+BOOKING_CREATED = 'booking.created'
+BOOKING_STATUS = 'booking.status'
+
+EVENT_FIELDS = ('id', 'user_id', 'resource_id', 'booking_date', 'time_slot', 'status')
+
+
+class Subscription:
+    """A client's queue of pending events plus the filter that feeds it."""
+
+    def __init__(self, loop, accepts, max_pending):
+        self.loop = loop
+        self.accepts = accepts
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.dropped = 0
+
+    def offer(self, event):
+        # Runs on the subscriber's event loop
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class InProcessBroker:
+    """
+    Fans events out to subscriptions in this process. publish() is safe to
+    call from any thread; delivery happens on each subscriber's loop. Slow
+    clients lose events once `max_pending` are queued rather than growing
+    memory without bound.
+    """
+
+    def __init__(self, max_pending=100):
+        self.max_pending = max_pending
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, accepts):
+        subscription = Subscription(asyncio.get_running_loop(), accepts, self.max_pending)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if not subscription.accepts(event):
+                continue
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # The client's loop has already shut down
+                self.unsubscribe(subscription)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'BOOKING_EVENTS_BROKER', 'resources.events.InProcessBroker')
+                _broker = import_string(path)()
+    return _broker
+
+
+def booking_event(kind, row):
+    return {
+        'type': kind,
+        'id': row['id'],
+        'user': row['user_id'],
+        'resource': row['resource_id'],
+        'booking_date': row['booking_date'].isoformat(),
+        'time_slot': row['time_slot'],
+        'status': row['status'],
+    }
+
+
+def publish_bookings(kind, bookings):
+    """
+    Publish `kind` for each booking (model instances or ids) after the
+    current transaction commits, so clients never see rolled-back changes.
+    """
+    bookings = list(bookings)
+    if not bookings:
+        return
+
+    def send():
+        from .models import Booking
+
+        if isinstance(bookings[0], Booking):
+            rows = [{field: getattr(booking, field) for field in EVENT_FIELDS} for booking in bookings]
+        else:
+            rows = Booking.objects.filter(id__in=bookings).order_by('id').values(*EVENT_FIELDS)
+        broker = get_broker()
+        for row in rows:
+            broker.publish(booking_event(kind, row))
+
+    transaction.on_commit(send)
+
+
+def accepts_for(user, resource_id=None):
+    """
+    Event filter for a subscriber. Staff get every booking, students only
+    their own, and ?resource= narrows either to one resource (students
+    then also see other people's bookings on it, as the list API does).
+    """
+    def accepts(event):
+        if resource_id is not None:
+            return event['resource'] == resource_id
+        return user.role == 'STAFF' or event['user'] == user.id
+    return accepts
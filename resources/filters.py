@@ -0,0 +1,43 @@
+"""
+Filtersets for the list endpoints. Each common combination is backed by
+an index declared on the model (see the Meta.indexes comments there).
+"""
+from django_filters import rest_framework as filters
+
+from .models import User, Resource, Booking
+
+
+class BookingFilter(filters.FilterSet):
+    """?status=, ?status__in=A,B, ?resource=, ?user=, ?booking_date__gte= / __lte=."""
+
+    class Meta:
+        model = Booking
+        fields = {
+            'status': ['exact', 'in'],
+            'resource': ['exact'],
+            'user': ['exact'],
+            'booking_date': ['exact', 'gte', 'lte'],
+        }
+
+
+class ResourceFilter(filters.FilterSet):
+    """?type=, ?status=, ?capacity__gte= / __lte=."""
+
+    class Meta:
+        model = Resource
+        fields = {
+            'type': ['exact'],
+            'status': ['exact'],
+            'capacity': ['gte', 'lte'],
+        }
+
+
+class UserFilter(filters.FilterSet):
+    """?role=, ?status=."""
+
+    class Meta:
+        model = User
+        fields = {
+            'role': ['exact'],
+            'status': ['exact'],
+        }
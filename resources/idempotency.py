@@ -0,0 +1,128 @@
+"""
+Idempotency-Key support for booking writes.
+
+A client that may retry a request (e.g. after a timeout) sends the same
+Idempotency-Key header with every attempt. The first response with a
+status below 500 is stored for IDEMPOTENCY_KEY_TTL seconds and replayed
+for later attempts, marked with Idempotent-Replayed: true. While the first
+attempt is still running, duplicates get 409 without reaching the view, so
+a retry storm never gets as far as the conflict check or the INSERT.
+
+Keys are scoped to the user and endpoint. Reusing a key with a different
+body is a client bug and gets 422. Keys live in the IdempotencyKey table:
+its unique (user, endpoint, key) constraint is the in-progress lock, so it
+holds across workers.
+"""
+import datetime
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+# Longest key accepted; UUIDs are the expected format
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _replay(record):
+    response = Response(record.response, status=record.status_code)
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def _in_progress():
+    response = Response(
+        {"detail": f"A request with this {IDEMPOTENCY_HEADER} is still being processed."},
+        status=status.HTTP_409_CONFLICT,
+    )
+    response['Retry-After'] = '1'
+    return response
+
+
+def _claim(scope, fingerprint, now):
+    """
+    Return the IdempotencyKey for `scope` with this attempt holding it, or
+    a Response for an attempt that must not run the view.
+    """
+    record = IdempotencyKey.objects.filter(**scope).first()
+    expires = now - datetime.timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 86400))
+
+    if record is None or record.created_at < expires:
+        # Expired keys are dropped as their owner sends new ones
+        IdempotencyKey.objects.filter(user_id=scope['user_id'], created_at__lt=expires).delete()
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(**scope, fingerprint=fingerprint, created_at=now)
+        except IntegrityError:
+            # Another attempt claimed it first
+            return _in_progress()
+
+    if record.fingerprint != fingerprint:
+        return Response(
+            {"detail": f"This {IDEMPOTENCY_HEADER} was already used with a different request body."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if record.status_code is not None:
+        return _replay(record)
+
+    stale = now - datetime.timedelta(seconds=getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 30))
+    if record.created_at >= stale:
+        return _in_progress()
+    # The first attempt died without finishing; take over unless someone else just did
+    taken_over = IdempotencyKey.objects.filter(
+        pk=record.pk, status_code__isnull=True, created_at=record.created_at
+    ).update(created_at=now)
+    if not taken_over:
+        return _in_progress()
+    record.created_at = now
+    return record
+
+
+def idempotent(view_method):
+    """
+    Make a viewset action honour the Idempotency-Key header. Requests
+    without the header are passed straight through.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            return view_method(self, request, *args, **kwargs)
+        if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            return Response(
+                {"detail": f"{IDEMPOTENCY_HEADER} must be 1-{IDEMPOTENCY_KEY_MAX_LENGTH} characters."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        scope = {'user_id': request.user.id, 'endpoint': f'{request.method} {request.path}', 'key': key}
+        record = _claim(scope, _fingerprint(request), timezone.now())
+        if isinstance(record, Response):
+            return record
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except BaseException:
+            record.delete()
+            raise
+        if response.status_code < 500:
+            record.status_code, record.response = response.status_code, response.data
+            record.save(update_fields=['status_code', 'response'])
+        else:
+            # Let the client retry a server error for real
+            record.delete()
+        return response
+
+    return wrapper
@@ -0,0 +1,39 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from resources.retention import rollup_sessions, archive_activity
+
+
+class Command(BaseCommand):
+    help = (
+        "Roll up completed days of UserActivity into DailySessionRollup, then "
+        "archive raw rows older than the retention window. Meant to run daily "
+        "(e.g. from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=getattr(settings, 'ACTIVITY_RETENTION_DAYS', 90),
+            help="Keep this many days of raw activity (default: ACTIVITY_RETENTION_DAYS).",
+        )
+        parser.add_argument(
+            '--output',
+            help="Append archived rows to this gzip JSON-lines file instead of the archive table.",
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError("--days must be at least 1 so only rolled-up days are archived.")
+
+        rolled_up = rollup_sessions()
+        self.stdout.write(f"Wrote {rolled_up} daily session rollups.")
+
+        cutoff_day = timezone.localdate() - datetime.timedelta(days=options['days'])
+        cutoff = timezone.make_aware(datetime.datetime.combine(cutoff_day, datetime.time.min))
+        moved = archive_activity(cutoff, output=options['output'], batch_size=options['batch_size'])
+        destination = options['output'] or 'UserActivityArchive'
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} activity rows from before {cutoff_day} to {destination}."))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from resources.analytics import backfill_usage
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the ResourceDailyUsage utilization rollup from the Bookings "
+        "table. Booking writes keep it current; run this once after deploying "
+        "it, or to repair it after writes that bypassed the app."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="First booking date to rebuild (YYYY-MM-DD).")
+        parser.add_argument('--until', help="Last booking date to rebuild (YYYY-MM-DD).")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        bounds = {}
+        for name in ('since', 'until'):
+            value = options[name]
+            try:
+                bounds[name] = parse_date(value) if value else None
+            except ValueError:
+                bounds[name] = None
+            if value and bounds[name] is None:
+                raise CommandError(f"--{name} must be a date in YYYY-MM-DD format.")
+
+        written = backfill_usage(bounds['since'], bounds['until'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} resource usage rows."))
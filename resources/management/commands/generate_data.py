@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from resources.benchmark import generate_data, BENCH_PASSWORD
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-insert synthetic users, resources, bookings and login activity for "
+        "benchmarking. Replaces any data a previous run generated."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--resources', type=int, default=100)
+        parser.add_argument('--bookings', type=int, default=10000)
+        parser.add_argument('--activity', type=int, default=10000)
+        parser.add_argument('--days', type=int, default=90, help="Spread bookings over this many days from today.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['users'] < 2 or options['resources'] < 1 or options['days'] < 1:
+            raise CommandError("Need at least 2 users, 1 resource and 1 day.")
+
+        counts = generate_data(
+            users=options['users'],
+            resources=options['resources'],
+            bookings=options['bookings'],
+            activity=options['activity'],
+            days=options['days'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+        )
+        summary = ', '.join(f"{count} {name}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Generated {summary}. Every user's password is '{BENCH_PASSWORD}'."))
@@ -0,0 +1,37 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from resources.user_import import parse_rows, import_users, ImportFormatError, USER_IMPORT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        "Create users from a CSV (name,email,phone,role,password) or JSON file. "
+        "Passwords are hashed in parallel and rows inserted in bulk; rows that "
+        "fail validation are reported and skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'json'], help="Defaults to the file extension.")
+        parser.add_argument('--workers', type=int, help="Hashing processes (default: USER_IMPORT_HASH_WORKERS or CPU count).")
+        parser.add_argument('--chunk-size', type=int, default=USER_IMPORT_CHUNK_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help="Validate only.")
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.is_file():
+            raise CommandError(f"{path} does not exist.")
+        fmt = options['format'] or ('json' if path.suffix.lower() == '.json' else 'csv')
+        try:
+            rows = parse_rows(path.read_bytes(), fmt)
+        except ImportFormatError as e:
+            raise CommandError(str(e))
+
+        result = import_users(rows, workers=options['workers'], chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+        for error in result['errors']:
+            messages = '; '.join(f"{field}: {' '.join(map(str, problems))}" for field, problems in error['errors'].items())
+            self.stderr.write(f"Row {error['row']} ({error['email']}): {messages}")
+        verb = "Would create" if options['dry_run'] else "Created"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {result['created']} users, {len(result['errors'])} rows skipped."))
@@ -0,0 +1,53 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from resources.benchmark import LoadScenario, MetricsOverhead, SyncAsyncComparison, format_report
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a seeded request mix (login, booking list/create, availability, "
+        "approval) against data from generate_data and report latency "
+        "percentiles, throughput and query counts. Writes to the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help="Requests per scenario.")
+        parser.add_argument('--login-iterations', type=int, default=5, help="Login requests (dominated by password hashing).")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON.")
+        parser.add_argument(
+            '--compare-async', action='store_true',
+            help="Instead, compare the sync read endpoints with their /api/async/ versions at equal concurrency.",
+        )
+        parser.add_argument(
+            '--metrics-overhead', action='store_true',
+            help="Instead, measure the per-request cost of the metrics instrumentation.",
+        )
+        parser.add_argument('--concurrency', type=int, default=8, help="Workers for --compare-async.")
+        parser.add_argument('--requests-per-worker', type=int, default=25, help="Requests per worker for --compare-async.")
+
+    def handle(self, *args, **options):
+        if options['metrics_overhead']:
+            scenario = MetricsOverhead(iterations=options['iterations'])
+        elif options['compare_async']:
+            scenario = SyncAsyncComparison(
+                concurrency=options['concurrency'],
+                requests_per_worker=options['requests_per_worker'],
+            )
+        else:
+            scenario = LoadScenario(
+                iterations=options['iterations'],
+                login_iterations=options['login_iterations'],
+                seed=options['seed'],
+            )
+        try:
+            report = scenario.run()
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.stdout.write(format_report(report))
@@ -0,0 +1,195 @@
+"""
+Request instrumentation: per-route latency histograms, DB query counts and
+time, serializer time and authentication time.
+
+MetricsMiddleware opens a RequestTimings for each request; the DB wrapper
+(installed on every connection), TimedSerializerMixin and the JWT
+authentication class add to it. Totals are kept per process and rendered
+in the Prometheus text format by /api/metrics/; each worker must be
+scraped separately.
+"""
+import contextvars
+import threading
+import time
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+current_timings = contextvars.ContextVar('current_timings', default=None)
+
+
+class RequestTimings:
+    __slots__ = ('db_queries', 'db_seconds', 'serializer_seconds', 'auth_seconds', 'serializing')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.auth_seconds = 0.0
+        self.serializing = False
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db_seconds += time.perf_counter() - start
+        timings.db_queries += 1
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    if _db_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_db_wrapper)
+
+
+class timed:
+    """Adds the time spent in the block to one field of the current RequestTimings."""
+    __slots__ = ('field', 'timings', 'start')
+
+    def __init__(self, field):
+        self.field = field
+
+    def __enter__(self):
+        self.timings = current_timings.get()
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        if self.timings is not None:
+            setattr(self.timings, self.field, getattr(self.timings, self.field) + time.perf_counter() - self.start)
+
+
+class TimedSerializerMixin:
+    """Counts to_representation() time; nested serializers aren't counted twice."""
+
+    def to_representation(self, instance):
+        timings = current_timings.get()
+        if timings is None or timings.serializing:
+            return super().to_representation(instance)
+        timings.serializing = True
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            timings.serializer_seconds += time.perf_counter() - start
+            timings.serializing = False
+
+
+class _RouteStats:
+    __slots__ = ('buckets', 'count', 'seconds', 'db_queries', 'db_seconds', 'serializer_seconds', 'auth_seconds')
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.seconds = 0.0
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.auth_seconds = 0.0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def observe(self, route, method, status_code, seconds, timings):
+        key = (route, method, f'{status_code // 100}xx')
+        with self._lock:
+            stats = self._routes.get(key)
+            if stats is None:
+                stats = self._routes[key] = _RouteStats()
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    stats.buckets[i] += 1
+                    break
+            stats.count += 1
+            stats.seconds += seconds
+            stats.db_queries += timings.db_queries
+            stats.db_seconds += timings.db_seconds
+            stats.serializer_seconds += timings.serializer_seconds
+            stats.auth_seconds += timings.auth_seconds
+
+    def reset(self):
+        with self._lock:
+            self._routes = {}
+
+    def render(self, extra=()):
+        """Prometheus text exposition format. `extra` adds (name, help, type, [(labels, value)]) families."""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            snapshot = [(key, _copy(stats)) for key, stats in routes]
+
+        lines = [
+            '# HELP campus_request_duration_seconds Request latency by route.',
+            '# TYPE campus_request_duration_seconds histogram',
+        ]
+        for (route, method, status_class), stats in snapshot:
+            labels = f'route="{route}",method="{method}",status="{status_class}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                cumulative += count
+                lines.append(f'campus_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'campus_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.count}')
+            lines.append(f'campus_request_duration_seconds_sum{{{labels}}} {stats.seconds:.6f}')
+            lines.append(f'campus_request_duration_seconds_count{{{labels}}} {stats.count}')
+
+        counters = [
+            ('campus_db_queries_total', 'Database queries run while serving the route.', 'db_queries'),
+            ('campus_db_seconds_total', 'Time spent executing database queries.', 'db_seconds'),
+            ('campus_serializer_seconds_total', 'Time spent in serializer to_representation().', 'serializer_seconds'),
+            ('campus_auth_seconds_total', 'Time spent authenticating the request.', 'auth_seconds'),
+        ]
+        for name, help_text, field in counters:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for (route, method, status_class), stats in snapshot:
+                value = getattr(stats, field)
+                value = f'{value:.6f}' if isinstance(value, float) else value
+                lines.append(f'{name}{{route="{route}",method="{method}",status="{status_class}"}} {value}')
+
+        for name, help_text, kind, samples in extra:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{val}"' for key, val in labels.items())
+                lines.append(f'{name}{{{label_text}}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _copy(stats):
+    clone = _RouteStats()
+    for field in _RouteStats.__slots__:
+        value = getattr(stats, field)
+        setattr(clone, field, list(value) if isinstance(value, list) else value)
+    return clone
+
+
+registry = MetricsRegistry()
+
+
+def metrics_enabled():
+    return getattr(settings, 'METRICS_ENABLED', True)
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    # View names keep label cardinality bounded; unmatched paths share one
+    return match.view_name if match is not None and match.view_name else 'unmatched'
+
+
+def server_timing(timings, total):
+    return ', '.join([
+        f'db;dur={timings.db_seconds * 1000:.1f};desc="{timings.db_queries} queries"',
+        f'serialize;dur={timings.serializer_seconds * 1000:.1f}',
+        f'auth;dur={timings.auth_seconds * 1000:.1f}',
+        f'total;dur={total * 1000:.1f}',
+    ])
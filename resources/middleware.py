@@ -0,0 +1,104 @@
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .routers import replica_reads_allowed, pin_to_primary, is_pinned
+from .metrics import RequestTimings, current_timings, metrics_enabled, registry, route_name, server_timing
+
+
+def _token_user_id(request):
+    """User id from the access token, or None. Authentication proper happens in the view."""
+    header = request.META.get('HTTP_AUTHORIZATION', '').split()
+    token = request.GET.get('token') if not header else None
+    if len(header) == 2 and header[0] in api_settings.AUTH_HEADER_TYPES:
+        token = header[1]
+    if not token:
+        return None
+    try:
+        return AccessToken(token).get(api_settings.USER_ID_CLAIM)
+    except TokenError:
+        return None
+
+
+def _after(request, response):
+    if request.method not in SAFE_METHODS and response.status_code < 400 and _token_user_id(request) is not None:
+        pin_to_primary(response)
+
+
+@sync_and_async_middleware
+def ReplicaRoutingMiddleware(get_response):
+    """
+    Lets ReplicaRouter serve safe-method reads from a replica, and pins the
+    client to the primary for REPLICA_PIN_SECONDS after a successful
+    authenticated write, so they read their own changes.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = replica_reads_allowed.set(request.method in SAFE_METHODS and not is_pinned(request))
+            try:
+                response = await get_response(request)
+            finally:
+                replica_reads_allowed.reset(token)
+            _after(request, response)
+            return response
+    else:
+        def middleware(request):
+            token = replica_reads_allowed.set(request.method in SAFE_METHODS and not is_pinned(request))
+            try:
+                response = get_response(request)
+            finally:
+                replica_reads_allowed.reset(token)
+            _after(request, response)
+            return response
+    return middleware
+
+
+def _record(request, response, timings, start):
+    total = time.perf_counter() - start
+    registry.observe(route_name(request), request.method, response.status_code, total, timings)
+    response['Server-Timing'] = server_timing(timings, total)
+    if getattr(settings, 'CORS_ALLOWED_ORIGINS', None):
+        # Browsers hide Server-Timing from cross-origin callers without this
+        response['Timing-Allow-Origin'] = ', '.join(settings.CORS_ALLOWED_ORIGINS)
+
+
+@sync_and_async_middleware
+def MetricsMiddleware(get_response):
+    """
+    Times each request and records it per route (see metrics.py), adding a
+    Server-Timing header with the DB, serializer and auth breakdown.
+    Streaming responses are timed up to the first byte only.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            if not metrics_enabled():
+                return await get_response(request)
+            timings = RequestTimings()
+            token = current_timings.set(timings)
+            start = time.perf_counter()
+            try:
+                response = await get_response(request)
+            finally:
+                current_timings.reset(token)
+            _record(request, response, timings, start)
+            return response
+    else:
+        def middleware(request):
+            if not metrics_enabled():
+                return get_response(request)
+            timings = RequestTimings()
+            token = current_timings.set(timings)
+            start = time.perf_counter()
+            try:
+                response = get_response(request)
+            finally:
+                current_timings.reset(token)
+            _record(request, response, timings, start)
+            return response
+    return middleware
@@ -0,0 +1,21 @@
+# Generated by Django 6.1.2 on 2026-10-18 14:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0002_useractivity'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['created_at', 'id'], name='Bookings_created_b37ec9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='useractivity',
+            index=models.Index(fields=['login_time', 'id'], name='UserActivit_login_t_1205e6_idx'),
+        ),
+    ]
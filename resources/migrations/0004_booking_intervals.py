@@ -0,0 +1,47 @@
+# Generated by Django 6.1.2 on 2026-10-18 14:47
+
+from django.db import migrations, models
+
+from resources.timeslots import parse_time_slot
+
+
+def parse_existing_slots(apps, schema_editor):
+    Booking = apps.get_model('resources', 'Booking')
+    batch = []
+    for booking in Booking.objects.only('id', 'time_slot').iterator(chunk_size=1000):
+        interval = parse_time_slot(booking.time_slot)
+        if interval is None:
+            # Left NULL; conflict checks fall back to comparing the slot text
+            continue
+        booking.start_time, booking.end_time = interval
+        batch.append(booking)
+        if len(batch) >= 1000:
+            Booking.objects.bulk_update(batch, ['start_time', 'end_time'])
+            batch = []
+    if batch:
+        Booking.objects.bulk_update(batch, ['start_time', 'end_time'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0003_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='end_time',
+            field=models.TimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='start_time',
+            field=models.TimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(parse_existing_slots, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['resource', 'booking_date', 'start_time'], name='Bookings_resourc_2e3533_idx'),
+        ),
+    ]
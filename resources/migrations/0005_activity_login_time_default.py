@@ -0,0 +1,19 @@
+# Generated by Django 6.1.2 on 2026-10-18 14:51
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0004_booking_intervals'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='useractivity',
+            name='login_time',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 6.1.2 on 2026-10-18 14:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0005_activity_login_time_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySessionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('role', models.CharField(choices=[('STUDENT', 'Student'), ('STAFF', 'Staff')], max_length=10)),
+                ('session_count', models.PositiveIntegerField(default=0)),
+                ('open_sessions', models.PositiveIntegerField(default=0)),
+                ('total_duration_seconds', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'DailySessionRollup',
+            },
+        ),
+        migrations.CreateModel(
+            name='UserActivityArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('user_id', models.BigIntegerField()),
+                ('login_time', models.DateTimeField()),
+                ('logout_time', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'UserActivityArchive',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='useractivity',
+            index=models.Index(fields=['user', 'login_time'], name='UserActivit_user_id_187186_idx'),
+        ),
+        migrations.AddField(
+            model_name='dailysessionrollup',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='useractivityarchive',
+            index=models.Index(fields=['user_id', 'login_time'], name='UserActivit_user_id_83bd28_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailysessionrollup',
+            index=models.Index(fields=['role', 'date'], name='DailySessio_role_44bb33_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailysessionrollup',
+            index=models.Index(fields=['user', 'date'], name='DailySessio_user_id_33c5a3_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailysessionrollup',
+            constraint=models.UniqueConstraint(fields=('date', 'user'), name='unique_daily_session_rollup'),
+        ),
+    ]
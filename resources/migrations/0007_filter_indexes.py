@@ -0,0 +1,33 @@
+# Generated by Django 6.1.2 on 2026-10-18 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0006_activity_retention'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='resource',
+            name='Resources_type_c7324b_idx',
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', 'booking_date'], name='Bookings_status_5bcc51_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', 'booking_date'], name='Bookings_user_id_9b5731_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resource',
+            index=models.Index(fields=['type', 'capacity'], name='Resources_type_086f62_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'status'], name='Users_role_35271e_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.1.2 on 2026-10-18 15:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0007_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='resource',
+            index=models.Index(fields=['name'], name='Resources_name_3fd6f6_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.1.2 on 2026-10-18 15:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0008_resource_name_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceDailyUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('approved_mask', models.PositiveIntegerField(default=0)),
+                ('pending_mask', models.PositiveIntegerField(default=0)),
+                ('resource', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='resources.resource')),
+            ],
+            options={
+                'db_table': 'ResourceDailyUsage',
+                'indexes': [models.Index(fields=['date', 'resource'], name='ResourceDai_date_001e36_idx')],
+                'constraints': [models.UniqueConstraint(fields=('resource', 'date'), name='unique_resource_daily_usage')],
+            },
+        ),
+    ]
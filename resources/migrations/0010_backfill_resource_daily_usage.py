@@ -0,0 +1,55 @@
+# Generated by Django 6.1.2 on 2026-10-18 15:35
+
+import datetime
+from collections import defaultdict
+
+from django.db import migrations
+
+# Booking.TIME_SLOTS as of this migration, bit i = slot i. Copied rather
+# than imported so later changes to the app can't change what this does.
+SLOTS = [
+    (datetime.time(9), datetime.time(10)),
+    (datetime.time(10), datetime.time(11)),
+    (datetime.time(11), datetime.time(12)),
+    (datetime.time(13), datetime.time(14)),
+    (datetime.time(14), datetime.time(15)),
+    (datetime.time(15), datetime.time(16)),
+    (datetime.time(16), datetime.time(17)),
+]
+
+
+def slot_mask(start_time, end_time):
+    mask = 0
+    for bit, (slot_start, slot_end) in enumerate(SLOTS):
+        if start_time < slot_end and slot_start < end_time:
+            mask |= 1 << bit
+    return mask
+
+
+def backfill_usage(apps, schema_editor):
+    # Same rollup as analytics.backfill_usage(), against the historical models
+    Booking = apps.get_model('resources', 'Booking')
+    ResourceDailyUsage = apps.get_model('resources', 'ResourceDailyUsage')
+    masks = defaultdict(lambda: [0, 0])
+    rows = Booking.objects.filter(
+        status__in=('APPROVED', 'PENDING'), start_time__isnull=False
+    ).order_by().values_list('resource_id', 'booking_date', 'status', 'start_time', 'end_time')
+    for resource_id, booking_date, booking_status, start_time, end_time in rows.iterator(chunk_size=5000):
+        masks[(resource_id, booking_date)][booking_status == 'PENDING'] |= slot_mask(start_time, end_time)
+    ResourceDailyUsage.objects.all().delete()
+    ResourceDailyUsage.objects.bulk_create([
+        ResourceDailyUsage(resource_id=resource_id, date=day, approved_mask=approved, pending_mask=pending)
+        for (resource_id, day), (approved, pending) in masks.items()
+        if approved | pending
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0009_resource_daily_usage'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_usage, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,9 @@
 from django.db import models
+from django.db.models.functions import Lower
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
+from .timeslots import parse_time_slot
 
 class UserManager(BaseUserManager):
     def create_user(self, email, name, password=None, **extra_fields):
@@ -40,6 +44,12 @@ class User(AbstractBaseUser):
 
     class Meta:
         db_table = 'Users'
+        indexes = [
+            # ?role= / ?role=&status= on the user list
+            models.Index(fields=['role', 'status']),
+            # Case-insensitive email checks in the bulk import
+            models.Index(Lower('email'), name='users_email_lower_idx'),
+        ]
 
     def __str__(self):
         return self.email
@@ -72,28 +82,72 @@ class Resource(models.Model):
     class Meta:
         db_table = 'Resources'
         indexes = [
-            models.Index(fields=['type']),
+            # ?type= with an optional capacity range; also serves type alone
+            models.Index(fields=['type', 'capacity']),
+            # Name prefix search when RESOURCE_SEARCH_BACKEND is 'database'
+            models.Index(fields=['name']),
         ]
 
     def __str__(self):
         return self.name
 
+class BookingQuerySet(models.QuerySet):
+    def overlapping(self, resource, booking_date, start_time, end_time, time_slot=None):
+        """
+        Live (non-rejected) bookings on the same resource and day whose
+        interval overlaps [start_time, end_time). Legacy rows without a
+        parsed interval still match on identical slot text, which is also
+        all a legacy booking (no interval) can be compared by.
+        """
+        if start_time is None or end_time is None:
+            return self.filter(time_slot=time_slot, resource=resource, booking_date=booking_date).exclude(status='REJECTED')
+        clash = models.Q(start_time__lt=end_time, end_time__gt=start_time)
+        if time_slot:
+            clash |= models.Q(time_slot=time_slot)
+        return self.filter(
+            clash, resource=resource, booking_date=booking_date
+        ).exclude(status='REJECTED')
+
 class Booking(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Pending'),
         ('APPROVED', 'Approved'),
         ('REJECTED', 'Rejected'),
     ]
+    # Slots offered by the booking form, in display order
+    TIME_SLOTS = [
+        '09:00 AM - 10:00 AM',
+        '10:00 AM - 11:00 AM',
+        '11:00 AM - 12:00 PM',
+        '01:00 PM - 02:00 PM',
+        '02:00 PM - 03:00 PM',
+        '03:00 PM - 04:00 PM',
+        '04:00 PM - 05:00 PM',
+    ]
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     resource = models.ForeignKey(Resource, on_delete=models.CASCADE)
     booking_date = models.DateField()
     time_slot = models.CharField(max_length=20) # e.g. "10AM-12PM"
+    # Parsed from time_slot on save, used for overlap checks
+    start_time = models.TimeField(null=True, blank=True)
+    end_time = models.TimeField(null=True, blank=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = BookingQuerySet.as_manager()
+
     class Meta:
         db_table = 'Bookings'
+        indexes = [
+            # Keyset pagination order
+            models.Index(fields=['created_at', 'id']),
+            # Interval overlap checks, and ?resource= with a date range
+            models.Index(fields=['resource', 'booking_date', 'start_time']),
+            # ?status= and ?user=, each with an optional date range
+            models.Index(fields=['status', 'booking_date']),
+            models.Index(fields=['user', 'booking_date']),
+        ]
         constraints = [
             models.UniqueConstraint(fields=['resource', 'booking_date', 'time_slot'], name='unique_double_booking')
         ]
@@ -101,14 +155,129 @@ class Booking(models.Model):
     def __str__(self):
         return f"{self.resource.name} - {self.booking_date} ({self.time_slot})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember where the booking was loaded from, so the usage rollup for
+        # the old day is refreshed too if an update moves it (see signals.py)
+        instance._loaded_usage_key = (instance.__dict__.get('resource_id'), instance.__dict__.get('booking_date'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Unparseable slot text has no interval; don't keep a stale one
+        self.start_time, self.end_time = parse_time_slot(self.time_slot) or (None, None)
+        super().save(*args, **kwargs)
+
 class UserActivity(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    login_time = models.DateTimeField(auto_now_add=True)
+    # Set explicitly by the buffered activity recorder, so not auto_now_add
+    login_time = models.DateTimeField(default=timezone.now)
     logout_time = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         db_table = 'UserActivity'
         ordering = ['-login_time']
+        indexes = [
+            # Keyset pagination order
+            models.Index(fields=['login_time', 'id']),
+            # Per-user session lookups (logout matching, rollups)
+            models.Index(fields=['user', 'login_time']),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.login_time}"
+
+class UserActivityArchive(models.Model):
+    """
+    UserActivity rows older than the retention window, moved here by the
+    archive_user_activity command. Keeps the original id and user id, with
+    no foreign key, so the archive outlives deleted users.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user_id = models.BigIntegerField()
+    login_time = models.DateTimeField()
+    logout_time = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'UserActivityArchive'
+        indexes = [
+            models.Index(fields=['user_id', 'login_time']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.login_time}"
+
+class DailySessionRollup(models.Model):
+    """
+    Per-user, per-day session totals built from UserActivity, so reports
+    don't have to scan the raw log. `role` is the user's role at rollup time.
+    """
+    date = models.DateField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    role = models.CharField(max_length=10, choices=User.ROLE_CHOICES)
+    session_count = models.PositiveIntegerField(default=0)
+    # Sessions without a logout yet count towards session_count only
+    open_sessions = models.PositiveIntegerField(default=0)
+    total_duration_seconds = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'DailySessionRollup'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'user'], name='unique_daily_session_rollup')
+        ]
+        indexes = [
+            models.Index(fields=['role', 'date']),
+            models.Index(fields=['user', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.date}: {self.session_count} sessions"
+
+class ResourceDailyUsage(models.Model):
+    """
+    Which standard slots (Booking.TIME_SLOTS, bit i = slot i) of a resource
+    are taken on a date, kept current by the booking signals and bulk paths
+    (see analytics.py). Days without live bookings have no row.
+    """
+    resource = models.ForeignKey(Resource, on_delete=models.CASCADE)
+    date = models.DateField()
+    approved_mask = models.PositiveIntegerField(default=0)
+    pending_mask = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'ResourceDailyUsage'
+        constraints = [
+            models.UniqueConstraint(fields=['resource', 'date'], name='unique_resource_daily_usage')
+        ]
+        indexes = [
+            # Utilization reports scan a date range across all resources
+            models.Index(fields=['date', 'resource']),
+        ]
+
+    def __str__(self):
+        return f"{self.resource_id} - {self.date}"
+
+class IdempotencyKey(models.Model):
+    """
+    An Idempotency-Key a user sent to one endpoint, and the response stored
+    for it (see idempotency.py). status_code is NULL while the first attempt
+    is still running.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # "METHOD /path/"
+    endpoint = models.CharField(max_length=255)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'IdempotencyKeys'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'endpoint', 'key'], name='unique_idempotency_key')
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.endpoint} {self.key}"
@@ -0,0 +1,35 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class OptInCursorPagination(CursorPagination):
+    """
+    Keyset pagination: each page is a range scan from the last row seen,
+    so deep pages cost the same as the first one (no OFFSET).
+
+    During the transition period it only applies when the client opts in
+    with ?page_size= or ?cursor=. Everyone else keeps getting a plain list
+    until CURSOR_PAGINATION_REQUIRED is switched on.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not getattr(settings, 'CURSOR_PAGINATION_REQUIRED', False):
+            params = request.query_params
+            if self.cursor_query_param not in params and self.page_size_query_param not in params:
+                return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class BookingCursorPagination(OptInCursorPagination):
+    ordering = ('-created_at', '-id')
+
+
+class UserActivityCursorPagination(OptInCursorPagination):
+    ordering = ('-login_time', '-id')
+
+
+class SessionRollupCursorPagination(OptInCursorPagination):
+    ordering = ('-date', '-id')
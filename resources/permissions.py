@@ -25,4 +25,4 @@ class IsOwnerOrStaff(permissions.BasePermission):
         # Owners can only view their own bookings? Or edit them?
         # Requirement: "STUDENT: Can create booking, Can view bookings"
         # Usually they should not edit approved bookings.
-        return obj.user == request.user
+        return obj.user_id == request.user.id
@@ -0,0 +1,60 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from .exports import stream_csv, stream_ndjson
+
+
+def to_columns(rows):
+    """
+    Turn a list of dicts into {"count": n, "columns": {name: [values...]}}.
+    """
+    columns = {}
+    if rows:
+        columns = {name: [row.get(name) for row in rows] for name in rows[0]}
+    return {'count': len(rows), 'columns': columns}
+
+
+class CompactJSONRenderer(JSONRenderer):
+    """
+    ?format=compact renders lists column-oriented instead of as a list of
+    objects, so field names are sent once rather than once per row.
+    Paginated responses keep their envelope with `results` converted.
+    Anything that isn't a list (single objects, errors) is left as is.
+    """
+    format = 'compact'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, list):
+            data = to_columns(data)
+        elif isinstance(data, dict) and isinstance(data.get('results'), list):
+            data = {**data, 'results': to_columns(data['results'])}
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    ?format=csv for the export actions. Exports stream their own body, so
+    this only renders the occasional error or single object.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        columns = list(rows[0]) if rows else []
+        return ''.join(stream_csv(rows, columns)).encode(self.charset)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """?format=ndjson, one JSON object per line."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        return ''.join(stream_ndjson(rows)).encode(self.charset)
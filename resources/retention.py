@@ -0,0 +1,111 @@
+import datetime
+import gzip
+import json
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from .models import UserActivity, UserActivityArchive, DailySessionRollup
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+    return start, start + datetime.timedelta(days=1)
+
+
+def rollup_sessions(since=None, until=None):
+    """
+    Rebuild DailySessionRollup for the days [since, until] from the raw log.
+
+    `until` defaults to yesterday (today isn't complete yet). `since`
+    defaults to the day after the latest rollup, or the first logged day.
+    Earlier days whose rollup still counts open sessions are rebuilt too,
+    while their raw rows are kept, so sessions that closed since the last
+    run get their duration. Re-running a range replaces its rollups.
+    Returns the number of rollup rows written.
+    """
+    until = until or timezone.localdate() - datetime.timedelta(days=1)
+    first = UserActivity.objects.aggregate(first=Min('login_time'))['first']
+    if first is None:
+        return 0
+    first_day = timezone.localdate(first)
+    if since is None:
+        latest = DailySessionRollup.objects.aggregate(latest=Max('date'))['latest']
+        since = latest + datetime.timedelta(days=1) if latest is not None else first_day
+
+    days = set(DailySessionRollup.objects.filter(
+        open_sessions__gt=0, date__gte=first_day, date__lt=since,
+    ).values_list('date', flat=True).distinct())
+    if since <= until:
+        days.update(since + datetime.timedelta(days=offset) for offset in range((until - since).days + 1))
+    if not days:
+        return 0
+
+    logged_in = Q()
+    for day in days:
+        start, end = _day_bounds(day)
+        logged_in |= Q(login_time__gte=start, login_time__lt=end)
+    totals = defaultdict(lambda: {'sessions': 0, 'open': 0, 'seconds': 0})
+    roles = {}
+    rows = UserActivity.objects.filter(logged_in).values_list(
+        'user_id', 'user__role', 'login_time', 'logout_time'
+    ).order_by()
+    for user_id, role, login_time, logout_time in rows.iterator(chunk_size=5000):
+        entry = totals[(timezone.localdate(login_time), user_id)]
+        entry['sessions'] += 1
+        if logout_time is None:
+            entry['open'] += 1
+        else:
+            entry['seconds'] += max(int((logout_time - login_time).total_seconds()), 0)
+        roles[user_id] = role
+
+    with transaction.atomic():
+        DailySessionRollup.objects.filter(date__in=days).delete()
+        DailySessionRollup.objects.bulk_create([
+            DailySessionRollup(
+                date=day,
+                user_id=user_id,
+                role=roles[user_id],
+                session_count=entry['sessions'],
+                open_sessions=entry['open'],
+                total_duration_seconds=entry['seconds'],
+            )
+            for (day, user_id), entry in totals.items()
+        ], batch_size=1000)
+    return len(totals)
+
+
+def archive_activity(before, output=None, batch_size=5000):
+    """
+    Move UserActivity rows that logged in before `before` out of the live
+    table, in id-ordered batches. Rows go to UserActivityArchive, or are
+    appended as JSON lines to the gzip file `output` when one is given.
+    Returns the number of rows moved.
+    """
+    moved = 0
+    archive_file = gzip.open(output, 'at', encoding='utf-8') if output else None
+    try:
+        while True:
+            batch = list(
+                UserActivity.objects.filter(login_time__lt=before)
+                .order_by('id')
+                .values('id', 'user_id', 'login_time', 'logout_time')[:batch_size]
+            )
+            if not batch:
+                break
+            with transaction.atomic():
+                if archive_file:
+                    for row in batch:
+                        archive_file.write(json.dumps(row, default=str) + '\n')
+                else:
+                    UserActivityArchive.objects.bulk_create(
+                        [UserActivityArchive(**row) for row in batch], ignore_conflicts=True
+                    )
+                UserActivity.objects.filter(id__in=[row['id'] for row in batch]).delete()
+            moved += len(batch)
+    finally:
+        if archive_file:
+            archive_file.close()
+    return moved
@@ -0,0 +1,98 @@
+"""
+Read-replica routing.
+
+ReplicaRoutingMiddleware marks safe-method requests as allowed to read from
+a replica, unless the client wrote something within the last
+REPLICA_PIN_SECONDS (read-your-writes). The pin is a short-lived cookie, so
+it holds whichever worker serves the next request. ReplicaRouter then sends
+allowed reads to one of DATABASE_REPLICAS, skipping any replica that can't
+be reached for REPLICA_RETRY_SECONDS. Everything else, including background
+threads and management commands, reads from the primary.
+
+Reads whose results are cached under a version counter or sent with an
+ETag run inside primary_reads(): a lagging replica would otherwise pair
+pre-write data with the post-write version, and it would stay cached.
+"""
+import contextlib
+import contextvars
+import itertools
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+# Set per request by ReplicaRoutingMiddleware
+replica_reads_allowed = contextvars.ContextVar('replica_reads_allowed', default=False)
+
+# Present while a client's reads must go to the primary
+PIN_COOKIE = 'primary_pin'
+
+
+@contextlib.contextmanager
+def primary_reads():
+    """Send this block's reads to the primary, even during a replica-eligible request."""
+    token = replica_reads_allowed.set(False)
+    try:
+        yield
+    finally:
+        replica_reads_allowed.reset(token)
+
+
+def pin_to_primary(response):
+    """Route the client's reads to the primary for REPLICA_PIN_SECONDS."""
+    response.set_cookie(
+        PIN_COOKIE, '1', max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5), httponly=True, samesite='Lax',
+    )
+
+
+def is_pinned(request):
+    return PIN_COOKIE in request.COOKIES
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self._down_until = {}
+        self._lock = threading.Lock()
+        self._cycle = None
+
+    @property
+    def replicas(self):
+        return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+    def _healthy(self, alias):
+        if self._down_until.get(alias, 0) > time.monotonic():
+            return False
+        try:
+            # No-op when this thread's connection is already open
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            with self._lock:
+                self._down_until[alias] = time.monotonic() + getattr(settings, 'REPLICA_RETRY_SECONDS', 30)
+            return False
+        return True
+
+    def _next_replica(self):
+        replicas = self.replicas
+        with self._lock:
+            if self._cycle is None or self._cycle[0] != replicas:
+                self._cycle = (replicas, itertools.cycle(replicas))
+            cycle = self._cycle[1]
+        # Round-robin, trying each replica at most once
+        for _ in replicas:
+            alias = next(cycle)
+            if self._healthy(alias):
+                return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_read(self, model, **hints):
+        if not replica_reads_allowed.get() or not self.replicas:
+            return None
+        return self._next_replica()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
@@ -0,0 +1,177 @@
+"""
+Resource search by name prefix or fuzzy match, combined with type,
+minimum capacity and status filters.
+
+The default backend is an in-process index (sorted word list for prefixes,
+trigram postings for typos). It is updated incrementally from the Resource
+signals and rebuilt whenever resource_cache's version moves without it,
+e.g. after a bulk_create or a write in another worker. Set
+RESOURCE_SEARCH_BACKEND = 'database' to use the indexed name__istartswith
+query instead.
+"""
+import bisect
+import re
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from .cache import resource_cache
+from .models import Resource
+
+SEARCH_FIELDS = ('id', 'name', 'type', 'capacity', 'status')
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
+
+# Share of the query's trigrams a name must contain to count as a fuzzy match
+FUZZY_THRESHOLD = 0.5
+
+# Ranking tiers, best first
+NAME_PREFIX, WORD_PREFIX, FUZZY = 0, 1, 2
+
+
+def index_row(resource):
+    return {field: getattr(resource, field) for field in SEARCH_FIELDS}
+
+
+def normalize(text):
+    return ' '.join(re.findall(r'\w+', text.lower()))
+
+
+def trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _matches_filters(row, resource_type, min_capacity, status):
+    return (
+        (resource_type is None or row['type'] == resource_type)
+        and (min_capacity is None or row['capacity'] >= min_capacity)
+        and (status is None or row['status'] == status)
+    )
+
+
+class ResourceIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._names = {}
+        self._words = [] # sorted (word, id) pairs
+        self._postings = {}
+        self.version = None
+
+    def _add(self, row):
+        name = normalize(row['name'])
+        self._rows[row['id']] = row
+        self._names[row['id']] = name
+        for word in set(name.split()):
+            bisect.insort(self._words, (word, row['id']))
+        for gram in trigrams(name):
+            self._postings.setdefault(gram, set()).add(row['id'])
+
+    def _remove(self, resource_id):
+        if self._rows.pop(resource_id, None) is None:
+            return
+        name = self._names.pop(resource_id)
+        for word in set(name.split()):
+            position = bisect.bisect_left(self._words, (word, resource_id))
+            if position < len(self._words) and self._words[position] == (word, resource_id):
+                del self._words[position]
+        for gram in trigrams(name):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(resource_id)
+                if not ids:
+                    del self._postings[gram]
+
+    def rebuild(self):
+        version = resource_cache.get_version()
+        # Tagged with the current version, so it mustn't come from a lagging replica
+        rows = list(Resource.objects.using(DEFAULT_DB_ALIAS).values(*SEARCH_FIELDS))
+        with self._lock:
+            self._rows, self._names, self._words, self._postings = {}, {}, [], {}
+            for row in rows:
+                self._add(row)
+            self.version = version
+
+    def apply(self, resource_id, row, before, after):
+        """
+        Apply one Resource write (`row` is None for a delete) made while
+        resource_cache moved from version `before` to `after`. Only done when the index was current as of
+        either version; otherwise it has missed other writes and the next
+        search rebuilds it.
+        """
+        with self._lock:
+            if self.version not in (before, after):
+                return
+            self._remove(resource_id)
+            if row is not None:
+                self._add(row)
+            self.version = after
+
+    def ensure_current(self):
+        if self.version != resource_cache.get_version():
+            self.rebuild()
+
+    def _prefix_ids(self, word):
+        position = bisect.bisect_left(self._words, (word, 0))
+        while position < len(self._words) and self._words[position][0].startswith(word):
+            yield self._words[position][1]
+            position += 1
+
+    def search(self, query='', resource_type=None, min_capacity=None, status=None, limit=SEARCH_DEFAULT_LIMIT):
+        self.ensure_current()
+        query = normalize(query)
+        with self._lock:
+            if not query:
+                rows = [row for row in self._rows.values() if _matches_filters(row, resource_type, min_capacity, status)]
+                return sorted(rows, key=lambda row: (row['name'].lower(), row['id']))[:limit]
+
+            scored = {}
+            tokens = query.split()
+            # Every query word must start some word of the name
+            for resource_id in set(self._prefix_ids(tokens[0])):
+                words = self._names[resource_id].split()
+                if all(any(word.startswith(token) for word in words) for token in tokens[1:]):
+                    tier = NAME_PREFIX if self._names[resource_id].startswith(query) else WORD_PREFIX
+                    scored[resource_id] = (tier, -1.0)
+
+            grams = trigrams(query)
+            if len(query) >= 3:
+                counts = Counter(resource_id for gram in grams for resource_id in self._postings.get(gram, ()))
+                for resource_id, count in counts.items():
+                    similarity = count / len(grams)
+                    if resource_id not in scored and similarity >= FUZZY_THRESHOLD:
+                        scored[resource_id] = (FUZZY, -similarity)
+
+            ranked = sorted(
+                (rank, len(self._names[resource_id]), self._names[resource_id], resource_id)
+                for resource_id, rank in scored.items()
+                if _matches_filters(self._rows[resource_id], resource_type, min_capacity, status)
+            )
+            return [self._rows[resource_id] for *_, resource_id in ranked[:limit]]
+
+
+resource_index = ResourceIndex()
+
+
+def database_search(query='', resource_type=None, min_capacity=None, status=None, limit=SEARCH_DEFAULT_LIMIT):
+    """Prefix-only fallback served by the Resource name index."""
+    resources = Resource.objects.all()
+    if query.strip():
+        resources = resources.filter(name__istartswith=query.strip())
+    if resource_type is not None:
+        resources = resources.filter(type=resource_type)
+    if min_capacity is not None:
+        resources = resources.filter(capacity__gte=min_capacity)
+    if status is not None:
+        resources = resources.filter(status=status)
+    return list(resources.order_by('name', 'id').values(*SEARCH_FIELDS)[:limit])
+
+
+def search_resources(query='', resource_type=None, min_capacity=None, status=None, limit=SEARCH_DEFAULT_LIMIT):
+    """Ranked matches as dicts of SEARCH_FIELDS, best first."""
+    if getattr(settings, 'RESOURCE_SEARCH_BACKEND', 'memory') == 'database':
+        return database_search(query, resource_type, min_capacity, status, limit)
+    return resource_index.search(query, resource_type, min_capacity, status, limit)
@@ -1,8 +1,65 @@
+import datetime
+import itertools
+from collections import defaultdict
+
+from django.db import transaction
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from .models import User, Resource, Booking, UserActivity
+from .models import User, Resource, Booking, UserActivity, DailySessionRollup
+from .signals import bookings_changed
+from .timeslots import parse_time_slot, slots_clash
+from .authentication import USER_CLAIMS
+from .metrics import TimedSerializerMixin
+
+def requested_fields(request):
+    """
+    Parse ?fields= and ?expand= into sets of names.
+    Either is None when the parameter wasn't sent.
+    """
+    def split(name):
+        value = request.query_params.get(name)
+        if value is None:
+            return None
+        return {item.strip() for item in value.split(',') if item.strip()}
+    return split('fields'), split('expand')
+
+class SparseFieldsMixin:
+    """
+    Trims read responses to the fields named in ?fields=.
+
+    Nested objects listed in Meta.expandable_fields are only included when
+    named in ?expand= (or ?fields=). Without either parameter the full
+    representation is returned, as before.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return
+        fields, expand = requested_fields(request)
+        if fields is None and expand is None:
+            return
+
+        expandable = set(getattr(self.Meta, 'expandable_fields', ()))
+        wanted_nested = (fields or set()) | (expand or set())
+        for name in list(self.fields):
+            if name in expandable:
+                keep = name in wanted_nested
+            else:
+                keep = fields is None or name in fields
+            if not keep:
+                self.fields.pop(name)
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        # Lets ClaimsJWTAuthentication build request.user without a query
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
     def validate(self, attrs):
         data = super().validate(attrs)
         # Custom data to include in response
@@ -16,7 +73,7 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         }
         return data
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'name', 'email', 'phone', 'role', 'status', 'password', 'created_at']
@@ -34,44 +91,106 @@ class UserSerializer(serializers.ModelSerializer):
         user.save()
         return user
 
-class ResourceSerializer(serializers.ModelSerializer):
+class UserImportRowSerializer(serializers.Serializer):
+    """
+    One row of a bulk user import. Deliberately not a ModelSerializer, so
+    email uniqueness isn't checked with a query per row (see user_import.py).
+    """
+    name = serializers.CharField(max_length=100)
+    email = serializers.EmailField(max_length=150)
+    phone = serializers.CharField(max_length=20, required=False, allow_blank=True, allow_null=True)
+    role = serializers.ChoiceField(choices=User.ROLE_CHOICES, required=False, allow_blank=True)
+    password = serializers.CharField(required=False, allow_blank=True, allow_null=True, trim_whitespace=False)
+
+    def validate_email(self, value):
+        return User.objects.normalize_email(value)
+
+class ResourceSerializer(TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Resource
         fields = '__all__'
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
     resource_details = ResourceSerializer(source='resource', read_only=True)
     user_details = UserSerializer(source='user', read_only=True)
 
     class Meta:
         model = Booking
-        fields = ['id', 'user', 'resource', 'booking_date', 'time_slot', 'status', 'created_at', 'resource_details', 'user_details']
-        read_only_fields = ['status', 'created_at', 'user']
+        fields = ['id', 'user', 'resource', 'booking_date', 'time_slot', 'start_time', 'end_time', 'status', 'created_at', 'resource_details', 'user_details']
+        read_only_fields = ['status', 'created_at', 'user', 'start_time', 'end_time']
+        expandable_fields = ['resource_details', 'user_details']
 
     def validate(self, data):
-        resource = data.get('resource')
-        booking_date = data.get('booking_date')
-        time_slot = data.get('time_slot')
-
-        # Check for conflicts excluding rejected bookings
-        if resource and booking_date and time_slot:
-            qs = Booking.objects.filter(
-                resource=resource, 
-                booking_date=booking_date, 
-                time_slot=time_slot
-            ).exclude(status='REJECTED')
-
-            if self.instance:
-                qs = qs.exclude(pk=self.instance.pk)
+        instance = self.instance
+        resource = data.get('resource', instance.resource if instance else None)
+        booking_date = data.get('booking_date', instance.booking_date if instance else None)
+        time_slot = data.get('time_slot', instance.time_slot if instance else None)
+        start_time, end_time = (instance.start_time, instance.end_time) if instance else (None, None)
 
-            if qs.exists():
+        # Only a new slot has to parse; legacy bookings keep theirs through
+        # updates to other fields
+        if 'time_slot' in data:
+            interval = parse_time_slot(time_slot)
+            if interval is None:
                 raise serializers.ValidationError({
-                    "non_field_errors": ["This resource is already booked for the selected date and time slot."]
+                    "time_slot": ["Time slot must be a time range such as '09:00 AM - 10:00 AM'."]
                 })
-        
+            data['start_time'], data['end_time'] = start_time, end_time = interval
+
+        # Check for overlapping bookings excluding rejected ones
+        if resource and booking_date and time_slot:
+            self.check_conflicts(resource, booking_date, time_slot, start_time, end_time)
+
         return data
 
-class BookingStatusSerializer(serializers.ModelSerializer):
+    def run_validators(self, value):
+        try:
+            super().run_validators(value)
+        except serializers.ValidationError as exc:
+            # Only the unique (resource, date, slot) validator means the exact
+            # slot is taken; it's the one serializer-level validator coded 'unique'
+            interval = parse_time_slot(value.get('time_slot'))
+            codes = exc.get_codes()
+            if isinstance(codes, list) and 'unique' in codes and interval and value.get('resource') and value.get('booking_date'):
+                self.conflict = (value['resource'], value['booking_date'], *interval)
+            raise
+
+    def check_conflicts(self, resource, booking_date, time_slot, start_time, end_time):
+        qs = Booking.objects.overlapping(resource, booking_date, start_time, end_time, time_slot)
+        if self.instance:
+            qs = qs.exclude(pk=self.instance.pk)
+        if qs.exists():
+            # Lets the view offer alternatives (see BookingViewSet.create)
+            self.conflict = (resource, booking_date, start_time, end_time)
+            raise serializers.ValidationError({
+                "non_field_errors": ["This resource is already booked for the selected date and time slot."]
+            })
+
+    def _locked_check(self, validated_data):
+        # Lock the resource row so concurrent requests for the same resource
+        # run their overlap check one at a time, then re-check under the lock
+        instance = self.instance
+        resource = validated_data.get('resource', instance.resource if instance else None)
+        Resource.objects.select_for_update().filter(pk=resource.pk).first()
+        self.check_conflicts(
+            resource,
+            validated_data.get('booking_date', instance.booking_date if instance else None),
+            validated_data.get('time_slot', instance.time_slot if instance else None),
+            validated_data.get('start_time', instance.start_time if instance else None),
+            validated_data.get('end_time', instance.end_time if instance else None),
+        )
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            self._locked_check(validated_data)
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            self._locked_check(validated_data)
+            return super().update(instance, validated_data)
+
+class BookingStatusSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Booking
         fields = ['status']
@@ -81,7 +200,219 @@ class BookingStatusSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Status can only be updated to APPROVED or REJECTED.")
         return value
 
-class UserActivitySerializer(serializers.ModelSerializer):
+# Upper bound on bookings created by one bulk request
+BULK_BOOKING_MAX_ITEMS = 200
+# Longest span a recurrence rule may cover
+RECURRENCE_MAX_DAYS = 366
+
+class BulkBookingItemSerializer(serializers.Serializer):
+    # Plain ids: resources are looked up in one query for the whole batch
+    resource = serializers.IntegerField()
+    booking_date = serializers.DateField()
+    time_slot = serializers.CharField(max_length=20)
+
+class RecurrenceSerializer(serializers.Serializer):
+    resource = serializers.IntegerField()
+    time_slot = serializers.CharField(max_length=20)
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    frequency = serializers.ChoiceField(choices=['DAILY', 'WEEKLY'], default='WEEKLY')
+    interval = serializers.IntegerField(min_value=1, max_value=RECURRENCE_MAX_DAYS, default=1)
+
+    def validate_time_slot(self, value):
+        if parse_time_slot(value) is None:
+            raise serializers.ValidationError("Time slot must be a time range such as '09:00 AM - 10:00 AM'.")
+        return value
+
+    def validate(self, data):
+        if data['end_date'] < data['start_date']:
+            raise serializers.ValidationError("end_date must not be before start_date.")
+        if (data['end_date'] - data['start_date']).days > RECURRENCE_MAX_DAYS:
+            raise serializers.ValidationError(f"A recurrence can span at most {RECURRENCE_MAX_DAYS} days.")
+        return data
+
+    def occurrences(self, data):
+        step = datetime.timedelta(days=data['interval'] * (7 if data['frequency'] == 'WEEKLY' else 1))
+        day = data['start_date']
+        while day <= data['end_date']:
+            yield {'resource': data['resource'], 'booking_date': day, 'time_slot': data['time_slot']}
+            if datetime.date.max - day < step:
+                break
+            day += step
+
+class BulkBookingSerializer(serializers.Serializer):
+    """
+    Creates many bookings at once, from either an explicit `bookings` list
+    or a `recurrence` rule (e.g. the same lab every Tuesday for a term).
+
+    Every requested slot is checked against existing bookings in one
+    query, and the free ones are inserted with a single bulk_create in
+    one transaction. save() returns one result per requested slot.
+    """
+    bookings = BulkBookingItemSerializer(many=True, required=False)
+    recurrence = RecurrenceSerializer(required=False)
+
+    def validate(self, data):
+        if ('bookings' in data) == ('recurrence' in data):
+            raise serializers.ValidationError("Provide either 'bookings' or 'recurrence'.")
+        if 'recurrence' in data:
+            # One past the cap is enough to know the rule is too long
+            items = list(itertools.islice(
+                self.fields['recurrence'].occurrences(data['recurrence']), BULK_BOOKING_MAX_ITEMS + 1
+            ))
+        else:
+            items = data['bookings']
+        if not items:
+            raise serializers.ValidationError("No bookings requested.")
+        if len(items) > BULK_BOOKING_MAX_ITEMS:
+            raise serializers.ValidationError(f"Cannot create more than {BULK_BOOKING_MAX_ITEMS} bookings at once.")
+        return {'items': items}
+
+    def create(self, validated_data):
+        items = validated_data['items']
+        user_id = validated_data['user_id']
+
+        results = []
+        to_create = []
+        with transaction.atomic():
+            # Lock the resources involved (in id order, to avoid deadlocks) so
+            # concurrent bookings for them wait until this batch is inserted
+            resources = {
+                resource.pk: resource
+                for resource in Resource.objects.select_for_update().filter(
+                    pk__in={item['resource'] for item in items}
+                ).order_by('pk')
+            }
+            existing = defaultdict(list)
+            rows = Booking.objects.filter(
+                resource_id__in=resources,
+                booking_date__in={item['booking_date'] for item in items},
+            ).values_list('resource_id', 'booking_date', 'time_slot', 'start_time', 'end_time', 'status')
+            for resource_id, booking_date, *booked in rows:
+                existing[(resource_id, booking_date)].append(booked)
+
+            for index, item in enumerate(items):
+                result = {
+                    'index': index,
+                    'resource': item['resource'],
+                    'booking_date': item['booking_date'],
+                    'time_slot': item['time_slot'],
+                }
+                results.append(result)
+                interval = parse_time_slot(item['time_slot'])
+                if item['resource'] not in resources:
+                    result.update(status='invalid', detail="Resource does not exist.")
+                    continue
+                if interval is None:
+                    result.update(status='invalid', detail="Time slot must be a time range such as '09:00 AM - 10:00 AM'.")
+                    continue
+
+                start_time, end_time = interval
+                same_day = existing[(item['resource'], item['booking_date'])]
+                # Rejected rows don't block an overlap, but still hold the
+                # unique (resource, date, slot) constraint for their exact slot
+                if any(
+                    slot == item['time_slot'] or (
+                        booked_status != 'REJECTED'
+                        and slots_clash(item['time_slot'], start_time, end_time, slot, start, end)
+                    )
+                    for slot, start, end, booked_status in same_day
+                ):
+                    result.update(status='conflict', detail="This resource is already booked for the selected date and time slot.")
+                    continue
+
+                # Later items in the same batch are checked against this one too
+                same_day.append((item['time_slot'], start_time, end_time, 'PENDING'))
+                result['status'] = 'created'
+                to_create.append((result, Booking(
+                    user_id=user_id,
+                    resource=resources[item['resource']],
+                    booking_date=item['booking_date'],
+                    time_slot=item['time_slot'],
+                    start_time=start_time,
+                    end_time=end_time,
+                )))
+
+            created = Booking.objects.bulk_create([booking for _, booking in to_create])
+
+        if not created:
+            return results
+        bookings_changed({(booking.resource_id, booking.booking_date) for booking in created})
+        if any(booking.pk is None for booking in created):
+            # Backends such as MySQL don't return ids from bulk inserts
+            ids = {
+                (row[0], row[1], row[2]): row[3]
+                for row in Booking.objects.filter(
+                    resource_id__in={b.resource_id for b in created},
+                    booking_date__in={b.booking_date for b in created},
+                    user_id=user_id,
+                ).values_list('resource_id', 'booking_date', 'time_slot', 'id')
+            }
+            for booking in created:
+                booking.pk = ids.get((booking.resource_id, booking.booking_date, booking.time_slot))
+        for result, booking in to_create:
+            result['id'] = booking.pk
+        return results
+
+# Upper bound on bookings updated by one batch status request
+BATCH_STATUS_MAX_IDS = 500
+
+class BatchStatusSerializer(serializers.Serializer):
+    """
+    Approves or rejects a list of bookings with one set-based UPDATE.
+
+    Approvals that would overlap an already APPROVED booking for the same
+    resource and date are skipped and reported as conflicts.
+    save() returns one result per requested id.
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=BATCH_STATUS_MAX_IDS)
+    status = serializers.ChoiceField(choices=['APPROVED', 'REJECTED'])
+
+    def create(self, validated_data):
+        ids = list(dict.fromkeys(validated_data['ids']))
+        new_status = validated_data['status']
+
+        with transaction.atomic():
+            # Lock the batch so a concurrent batch can't approve a clashing booking
+            bookings = Booking.objects.select_for_update().only(
+                'id', 'resource_id', 'booking_date', 'time_slot', 'start_time', 'end_time', 'status'
+            ).in_bulk(ids)
+
+            approved = defaultdict(list)
+            if new_status == 'APPROVED' and bookings:
+                rows = Booking.objects.filter(
+                    status='APPROVED',
+                    resource_id__in={b.resource_id for b in bookings.values()},
+                    booking_date__in={b.booking_date for b in bookings.values()},
+                ).exclude(id__in=bookings).values_list('resource_id', 'booking_date', 'time_slot', 'start_time', 'end_time')
+                for resource_id, booking_date, *interval in rows:
+                    approved[(resource_id, booking_date)].append(interval)
+
+            results = []
+            update_ids = []
+            for booking_id in ids:
+                booking = bookings.get(booking_id)
+                if booking is None:
+                    results.append({'id': booking_id, 'status': 'not_found', 'detail': "Booking does not exist."})
+                    continue
+                if new_status == 'APPROVED':
+                    same_day = approved[(booking.resource_id, booking.booking_date)]
+                    interval = (booking.time_slot, booking.start_time, booking.end_time)
+                    if any(slots_clash(*interval, *other) for other in same_day):
+                        results.append({'id': booking_id, 'status': 'conflict', 'detail': "Another booking is already approved for this resource, date and time slot."})
+                        continue
+                    same_day.append(interval)
+                update_ids.append(booking_id)
+                results.append({'id': booking_id, 'status': 'updated'})
+
+            if update_ids:
+                Booking.objects.filter(id__in=update_ids).update(status=new_status)
+
+        if update_ids:
+            bookings_changed({(bookings[pk].resource_id, bookings[pk].booking_date) for pk in update_ids})
+        return results
+
+class UserActivitySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user_name = serializers.CharField(source='user.name', read_only=True)
     user_email = serializers.CharField(source='user.email', read_only=True)
     user_role = serializers.CharField(source='user.role', read_only=True)
@@ -89,3 +420,11 @@ class UserActivitySerializer(serializers.ModelSerializer):
     class Meta:
         model = UserActivity
         fields = ['id', 'user_name', 'user_email', 'user_role', 'login_time', 'logout_time']
+
+class DailySessionRollupSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    user_name = serializers.CharField(source='user.name', read_only=True)
+    user_email = serializers.CharField(source='user.email', read_only=True)
+
+    class Meta:
+        model = DailySessionRollup
+        fields = ['id', 'date', 'user', 'user_name', 'user_email', 'role', 'session_count', 'open_sessions', 'total_duration_seconds']
@@ -0,0 +1,67 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import User, Resource, Booking
+from .availability import availability_cache
+from .cache import resource_cache, booking_versions, user_versions
+from .authentication import remember_user_state
+from .search import resource_index, index_row
+from .analytics import refresh_usage
+
+
+def _bump_booking_versions():
+    availability_cache.bump()
+    booking_versions.bump()
+
+
+def bookings_changed(usage_keys=()):
+    """
+    Once the transaction commits, invalidate everything derived from the
+    Bookings table and refresh the utilization rollup for the
+    (resource_id, date) pairs in `usage_keys`. Bumping earlier would let a
+    concurrent read cache pre-commit rows under the new version.
+
+    Runs from the model signals below, and must be called explicitly after
+    bulk_create() or queryset.update(), which don't send them.
+    """
+    transaction.on_commit(_bump_booking_versions)
+    usage_keys = set(usage_keys)
+    if usage_keys:
+        # The write has committed; a failed refresh mustn't turn it into a 500
+        transaction.on_commit(lambda: refresh_usage(usage_keys), robust=True)
+
+
+def users_changed():
+    """Same as bookings_changed(), for the Users table."""
+    transaction.on_commit(user_versions.bump)
+
+
+@receiver([post_save, post_delete], sender=Booking)
+def on_booking_change(sender, instance, **kwargs):
+    keys = {(instance.resource_id, instance.booking_date)}
+    # An update may have moved the booking to another resource or day
+    keys.add(getattr(instance, '_loaded_usage_key', (None, None)))
+    bookings_changed(keys)
+
+
+@receiver([post_save, post_delete], sender=Resource)
+def on_resource_change(sender, instance, signal, **kwargs):
+    # Capture the row now: a deleted instance loses its pk before commit
+    resource_id, row = instance.pk, None if signal is post_delete else index_row(instance)
+
+    def committed():
+        before = resource_cache.get_version()
+        after = resource_cache.bump()
+        # Resource names and statuses are part of the availability matrix
+        availability_cache.bump()
+        resource_index.apply(resource_id, row, before, after)
+    transaction.on_commit(committed)
+
+
+@receiver([post_save, post_delete], sender=User)
+def on_user_change(sender, instance, signal, **kwargs):
+    users_changed()
+    # Tokens carry role/status claims; record the current values so stale
+    # tokens are refused
+    remember_user_state(instance, deleted=signal is post_delete)
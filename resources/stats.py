@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .cache import resource_cache, booking_versions, user_versions
+from .models import User, Resource, Booking
+from .routers import primary_reads
+
+# Entries are keyed by these, so any write to the counted tables retires them
+_STATS_VERSIONS = (booking_versions, resource_cache, user_versions)
+
+
+def _grouped_query(queryset, field):
+    return queryset.order_by().values(field).annotate(count=Count('id'))
+
+
+def _fill_counts(rows, field, choices):
+    counts = {value: 0 for value, _ in choices}
+    for row in rows:
+        counts[row[field]] = row['count']
+    counts['total'] = sum(counts.values())
+    return counts
+
+
+def _grouped_counts(queryset, field, choices):
+    """
+    Run a single GROUP BY query and return {'total': n, CHOICE: n, ...}
+    with every choice present, even when it has no rows.
+    """
+    return _fill_counts(_grouped_query(queryset, field), field, choices)
+
+
+async def _agrouped_counts(queryset, field, choices):
+    return _fill_counts([row async for row in _grouped_query(queryset, field)], field, choices)
+
+
+def _stats_cache_key(user, versions):
+    # Staff share one global entry, everyone else gets their own scoped entry
+    scope = 'staff' if user.role == 'STAFF' else f'user:{user.pk}'
+    return f'stats:{scope}:' + ':'.join(map(str, versions))
+
+
+def _scoped_bookings(user):
+    bookings = Booking.objects.all()
+    if user.role != 'STAFF':
+        bookings = bookings.filter(user_id=user.pk)
+    return bookings
+
+
+def get_dashboard_stats(user):
+    """
+    Dashboard counters scoped to the caller's role.
+
+    Staff see global booking, resource and user counts. Students only see
+    their own bookings and the resources they can book. Results are cached
+    until the next booking, resource or user write (or STATS_CACHE_TIMEOUT
+    seconds) so dashboard loads don't hit the tables.
+    """
+    key = _stats_cache_key(user, [versions.get_version() for versions in _STATS_VERSIONS])
+    stats = cache.get(key)
+    if stats is not None:
+        return stats
+
+    bookings = _scoped_bookings(user)
+    # Cached under the current versions, so read from the primary
+    with primary_reads():
+        stats = {
+            'bookings': _grouped_counts(bookings, 'status', Booking.STATUS_CHOICES),
+            'resources': _grouped_counts(Resource.objects.all(), 'status', Resource.STATUS_CHOICES),
+        }
+        if user.role == 'STAFF':
+            stats['users'] = _grouped_counts(User.objects.all(), 'role', User.ROLE_CHOICES)
+
+    cache.set(key, stats, getattr(settings, 'STATS_CACHE_TIMEOUT', 30))
+    return stats
+
+
+async def aget_dashboard_stats(user):
+    """get_dashboard_stats() using the async ORM and cache API."""
+    key = _stats_cache_key(user, [await versions.aget_version() for versions in _STATS_VERSIONS])
+    stats = await cache.aget(key)
+    if stats is not None:
+        return stats
+
+    bookings = _scoped_bookings(user)
+    with primary_reads():
+        stats = {
+            'bookings': await _agrouped_counts(bookings, 'status', Booking.STATUS_CHOICES),
+            'resources': await _agrouped_counts(Resource.objects.all(), 'status', Resource.STATUS_CHOICES),
+        }
+        if user.role == 'STAFF':
+            stats['users'] = await _agrouped_counts(User.objects.all(), 'role', User.ROLE_CHOICES)
+
+    await cache.aset(key, stats, getattr(settings, 'STATS_CACHE_TIMEOUT', 30))
+    return stats
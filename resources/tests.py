@@ -1,3 +1,1154 @@
-from django.test import TestCase
+import asyncio
+import csv
+import datetime
+import gzip
+import io
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import check_password
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections, router as db_router
+from django.utils import timezone
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+
+from .models import User, Resource, Booking, UserActivity, UserActivityArchive, DailySessionRollup, ResourceDailyUsage, IdempotencyKey
+from .timeslots import parse_time_slot
+from .activity import ActivityRecorder
+from .retention import rollup_sessions, archive_activity
+from .benchmark import generate_data, LoadScenario
+from .exports import booking_rows
+from .filters import BookingFilter, ResourceFilter, UserFilter
+from .cache import resource_cache, booking_versions
+from .search import resource_index
+from .routers import ReplicaRouter, PIN_COOKIE
+from .metrics import registry as metrics_registry
+from .user_import import hash_passwords, import_users
+from .analytics import backfill_usage
+from .serializers import BookingSerializer, CustomTokenObtainPairSerializer
+from .availability import suggest_alternatives
+from .authentication import ClaimsJWTAuthentication
+
+
+# Keep a configured replica (CAMPUS_DB_REPLICA) out of every test that
+# doesn't ask for it; the test database isn't replicated to it
+_no_replicas = override_settings(DATABASE_REPLICAS=[])
+
+
+def setUpModule():
+    _no_replicas.enable()
+
+
+def tearDownModule():
+    _no_replicas.disable()
+
+
+class QueryBudgetMixin:
+    """
+    Helpers for asserting how many queries an endpoint runs.
+
+    Use assertQueryBudget for a hard ceiling on a single request, and
+    assertConstantQueries to prove the count doesn't grow with the number
+    of rows (i.e. there is no N+1).
+    """
+
+    def assertQueryBudget(self, budget, url, method='get', **kwargs):
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, **kwargs)
+        queries = '\n'.join(q['sql'] for q in ctx.captured_queries)
+        self.assertLessEqual(
+            len(ctx), budget,
+            f"{method.upper()} {url} ran {len(ctx)} queries, budget is {budget}:\n{queries}"
+        )
+        return response
+
+    def assertConstantQueries(self, url, add_rows, method='get', **kwargs):
+        with CaptureQueriesContext(connection) as before:
+            getattr(self.client, method)(url, **kwargs)
+        add_rows()
+        with CaptureQueriesContext(connection) as after:
+            getattr(self.client, method)(url, **kwargs)
+        self.assertEqual(
+            len(before), len(after),
+            f"{method.upper()} {url} went from {len(before)} to {len(after)} queries as rows were added"
+        )
+
+
+class QueryBudgetTests(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('staff@example.com', 'Staff', role='STAFF')
+        self.client.force_authenticate(self.staff)
+        self.resources = [
+            Resource.objects.create(name=f'Lab {i}', type='Lab', capacity=20) for i in range(3)
+        ]
+        self.add_bookings(5)
+
+    def add_bookings(self, count):
+        start = Booking.objects.count()
+        for i in range(start, start + count):
+            student = User.objects.create_user(f'student{i}@example.com', f'Student {i}')
+            Booking.objects.create(
+                user=student,
+                resource=self.resources[i % len(self.resources)],
+                booking_date=datetime.date(2026, 1, 1) + datetime.timedelta(days=i),
+                time_slot=Booking.TIME_SLOTS[0],
+            )
+            UserActivity.objects.create(user=student)
+
+    def test_booking_list(self):
+        self.assertQueryBudget(1, '/api/bookings/')
+        self.assertConstantQueries('/api/bookings/', lambda: self.add_bookings(5))
+
+    def test_booking_list_paginated(self):
+        self.assertQueryBudget(1, '/api/bookings/?page_size=3')
+
+    def test_booking_detail(self):
+        booking = Booking.objects.first()
+        self.assertQueryBudget(1, f'/api/bookings/{booking.id}/')
+
+    def test_user_activity_list(self):
+        self.assertQueryBudget(1, '/api/user-activity/')
+        self.assertConstantQueries('/api/user-activity/', lambda: self.add_bookings(5))
+
+    def test_booking_list_sparse_fields(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/bookings/?fields=id,status')
+        self.assertEqual(set(response.json()[0]), {'id', 'status'})
+        self.assertNotIn('JOIN', ctx.captured_queries[0]['sql'])
+
+    def test_booking_list_expand(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/bookings/?fields=id&expand=resource_details')
+        self.assertEqual(len(ctx.captured_queries), 1)
+        row = response.json()[0]
+        self.assertEqual(set(row), {'id', 'resource_details'})
+        self.assertEqual(row['resource_details']['name'], Booking.objects.get(pk=row['id']).resource.name)
+        self.assertIn('"Resources"', ctx.captured_queries[0]['sql'])
+        self.assertNotIn('"Users"', ctx.captured_queries[0]['sql'])
+
+        # ?expand= alone keeps the plain fields and drops the other nested object
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/bookings/?expand=user_details')
+        self.assertEqual(len(ctx.captured_queries), 1)
+        row = response.json()[0]
+        self.assertIn('user_details', row)
+        self.assertIn('status', row)
+        self.assertNotIn('resource_details', row)
+        self.assertIn('"Users"', ctx.captured_queries[0]['sql'])
+        self.assertNotIn('"Resources"', ctx.captured_queries[0]['sql'])
+
+    def test_booking_list_compact(self):
+        rows = self.client.get('/api/bookings/?fields=id,status').json()
+        response = self.client.get('/api/bookings/?fields=id,status&format=compact')
+        self.assertEqual(response.json(), {
+            'count': 5,
+            'columns': {'id': [row['id'] for row in rows], 'status': ['PENDING'] * 5},
+        })
+
+        page = self.client.get('/api/bookings/?fields=id&page_size=3').json()
+        response = self.client.get('/api/bookings/?fields=id&format=compact&page_size=3')
+        compact = response.json()
+        self.assertIn('format=compact', compact['next'])
+        self.assertIsNone(compact['previous'])
+        self.assertEqual(compact['results'], {'count': 3, 'columns': {'id': [row['id'] for row in page['results']]}})
+
+        # Single objects are left as is
+        response = self.client.get(f'/api/bookings/{rows[0]["id"]}/?fields=id&format=compact')
+        self.assertEqual(response.json(), {'id': rows[0]['id']})
+
+
+class CursorPaginationTests(APITestCase):
+    urls = [('/api/bookings/?page_size=2', Booking), ('/api/user-activity/?page_size=2', UserActivity)]
+
+    def setUp(self):
+        self.staff = User.objects.create_user('staff@example.com', 'Staff', role='STAFF')
+        lab = Resource.objects.create(name='Lab', type='Lab', capacity=20)
+        start = timezone.now()
+        for day in range(1, 6):
+            moment = start + datetime.timedelta(seconds=day)
+            booking = Booking.objects.create(user=self.staff, resource=lab, booking_date=datetime.date(2030, 1, day), time_slot=Booking.TIME_SLOTS[0])
+            Booking.objects.filter(pk=booking.pk).update(created_at=moment)
+            UserActivity.objects.create(user=self.staff, login_time=moment)
+        self.client.force_authenticate(self.staff)
+
+    def walk(self, url):
+        ids, pages = [], []
+        while url:
+            page = self.client.get(url).json()
+            pages.append(page)
+            ids += [row['id'] for row in page['results']]
+            url = page['next']
+        return ids, pages
+
+    def test_next_and_previous_cursors(self):
+        for url, model in self.urls:
+            ids, pages = self.walk(url)
+            self.assertEqual(ids, sorted(model.objects.values_list('id', flat=True), reverse=True))
+            self.assertEqual([len(page['results']) for page in pages], [2, 2, 1])
+            self.assertIsNone(pages[0]['previous'])
+            back = self.client.get(pages[2]['previous']).json()
+            self.assertEqual([row['id'] for row in back['results']], ids[2:4])
+
+    def test_ties_on_the_sort_key_are_broken_by_id(self):
+        Booking.objects.update(created_at=timezone.now())
+        UserActivity.objects.update(login_time=timezone.now())
+        for url, model in self.urls:
+            ids, _ = self.walk(url)
+            self.assertEqual(ids, sorted(model.objects.values_list('id', flat=True), reverse=True))
+
+    def test_pagination_is_opt_in(self):
+        for url in ('/api/bookings/', '/api/user-activity/'):
+            body = self.client.get(url).json()
+            self.assertIsInstance(body, list)
+            self.assertEqual(len(body), 5)
+        # A cursor alone opts in too, at the default page size
+        next_url = self.client.get('/api/bookings/?page_size=4').json()['next']
+        cursor = next_url.split('cursor=')[1].split('&')[0]
+        self.assertEqual(len(self.client.get(f'/api/bookings/?cursor={cursor}').json()['results']), 1)
+
+    @override_settings(CURSOR_PAGINATION_REQUIRED=True)
+    def test_pagination_can_be_required(self):
+        for url in ('/api/bookings/', '/api/user-activity/'):
+            body = self.client.get(url).json()
+            self.assertEqual(set(body), {'next', 'previous', 'results'})
+            self.assertEqual(len(body['results']), 5)
+
+
+class StatsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user('staff@example.com', 'Staff', role='STAFF')
+        self.student = User.objects.create_user('student@example.com', 'Student')
+        other = User.objects.create_user('other@example.com', 'Other')
+        self.lab = Resource.objects.create(name='Lab', type='Lab', capacity=20)
+        Booking.objects.create(user=self.student, resource=self.lab, booking_date=datetime.date(2030, 1, 7), time_slot=Booking.TIME_SLOTS[0], status='APPROVED')
+        Booking.objects.create(user=other, resource=self.lab, booking_date=datetime.date(2030, 1, 7), time_slot=Booking.TIME_SLOTS[1])
+
+    def test_students_see_their_own_bookings(self):
+        self.client.force_authenticate(self.student)
+        with self.assertNumQueries(2):
+            stats = self.client.get('/api/stats/').json()
+        self.assertEqual(stats['bookings'], {'total': 1, 'PENDING': 0, 'APPROVED': 1, 'REJECTED': 0})
+        self.assertNotIn('users', stats)
+
+    def test_staff_stats_are_cached_until_a_write(self):
+        self.client.force_authenticate(self.staff)
+        with self.assertNumQueries(3):
+            stats = self.client.get('/api/stats/').json()
+        self.assertEqual(stats['bookings']['total'], 2)
+        self.assertEqual(stats['users'], {'total': 3, 'STUDENT': 2, 'STAFF': 1})
+        with self.assertNumQueries(0):
+            self.client.get('/api/stats/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(user=self.staff, resource=self.lab, booking_date=datetime.date(2030, 1, 8), time_slot=Booking.TIME_SLOTS[0])
+        self.assertEqual(self.client.get('/api/stats/').json()['bookings']['PENDING'], 2)
+
+
+class AvailabilityTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create_user('student@example.com', 'Student')
+        self.lab = Resource.objects.create(name='Lab', type='Lab', capacity=20)
+        self.hall = Resource.objects.create(name='Hall', type='Event Hall', capacity=200)
+        self.day = datetime.date(2030, 1, 7)
+        for slot, booking_status in [(0, 'APPROVED'), (2, 'PENDING'), (3, 'REJECTED')]:
+            Booking.objects.create(user=self.student, resource=self.lab, booking_date=self.day, time_slot=Booking.TIME_SLOTS[slot], status=booking_status)
+        # Spans the 11-12 and 1-2 slots
+        Booking.objects.create(user=self.student, resource=self.hall, booking_date=self.day, time_slot='11:30 AM - 01:30 PM')
+        self.client.force_authenticate(self.student)
+
+    def grid(self, **params):
+        return self.client.get('/api/availability/', {'from': self.day, **params})
+
+    def test_bitmaps(self):
+        lab, hall = self.grid().json()['resources']
+        self.assertEqual(lab['taken'], {self.day.isoformat(): 0b101})
+        self.assertEqual(hall['taken'], {self.day.isoformat(): 0b1100})
+        self.assertEqual([row['name'] for row in self.grid(type='Event Hall').json()['resources']], ['Hall'])
+
+    def test_range_cap(self):
+        self.assertEqual(self.grid(to=self.day + datetime.timedelta(days=61)).status_code, 200)
+        self.assertEqual(self.grid(to=self.day + datetime.timedelta(days=62)).status_code, 400)
+        self.assertEqual(self.grid(to=self.day - datetime.timedelta(days=1)).status_code, 400)
+
+    def test_booking_write_invalidates_the_grid(self):
+        self.grid()
+        with self.assertNumQueries(0):
+            self.grid()
+        version = booking_versions.get_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(user=self.student, resource=self.lab, booking_date=self.day, time_slot=Booking.TIME_SLOTS[1])
+            # Until the write commits, readers can't see it, so nothing is invalidated
+            self.assertEqual(booking_versions.get_version(), version)
+            with self.assertNumQueries(0):
+                self.grid()
+        self.assertNotEqual(booking_versions.get_version(), version)
+        self.assertEqual(self.grid().json()['resources'][0]['taken'], {self.day.isoformat(): 0b111})
+
+
+class BulkBookingTests(APITestCase):
+    def setUp(self):
+        self.student = User.objects.create_user('student@example.com', 'Student')
+        self.lab = Resource.objects.create(name='Lab', type='Lab', capacity=20)
+        self.day = datetime.date(2030, 1, 7)
+        Booking.objects.create(user=self.student, resource=self.lab, booking_date=self.day, time_slot=Booking.TIME_SLOTS[0])
+        self.client.force_authenticate(self.student)
+
+    def item(self, time_slot, resource=None, day=None):
+        return {'resource': resource or self.lab.pk, 'booking_date': (day or self.day).isoformat(), 'time_slot': time_slot}
+
+    def test_per_item_results(self):
+        response = self.client.post('/api/bookings/bulk/', {'bookings': [
+            self.item(Booking.TIME_SLOTS[1]),
+            self.item('09:30 AM - 10:30 AM'),       # overlaps the existing booking
+            self.item('10:30 AM - 11:30 AM'),       # overlaps item 0 in this batch
+            self.item(Booking.TIME_SLOTS[2], resource=9999),
+            self.item('whenever'),
+        ]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        results = response.json()['results']
+        self.assertEqual([r['status'] for r in results], ['created', 'conflict', 'conflict', 'invalid', 'invalid'])
+        self.assertEqual(Booking.objects.get(pk=results[0]['id']).time_slot, Booking.TIME_SLOTS[1])
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_recurrence_and_all_conflicts(self):
+        rule = {'resource': self.lab.pk, 'time_slot': Booking.TIME_SLOTS[0], 'start_date': self.day.isoformat(),
+                'end_date': (self.day + datetime.timedelta(days=14)).isoformat(), 'frequency': 'WEEKLY'}
+        results = self.client.post('/api/bookings/bulk/', {'recurrence': rule}, format='json').json()['results']
+        self.assertEqual([(r['booking_date'], r['status']) for r in results], [
+            ('2030-01-07', 'conflict'), ('2030-01-14', 'created'), ('2030-01-21', 'created'),
+        ])
+        self.assertEqual(self.client.post('/api/bookings/bulk/', {'recurrence': rule}, format='json').status_code, 409)
+
+    def test_item_cap(self):
+        items = [self.item(Booking.TIME_SLOTS[1], day=self.day + datetime.timedelta(days=i)) for i in range(201)]
+        self.assertEqual(self.client.post('/api/bookings/bulk/', {'bookings': items}, format='json').status_code, 400)
+        response = self.client.post('/api/bookings/bulk/', {'bookings': items[:200]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Booking.objects.count(), 201)
+
+
+    def test_recurrence_bounds(self):
+        rule = {'resource': self.lab.pk, 'time_slot': Booking.TIME_SLOTS[0], 'frequency': 'DAILY'}
+        before = Booking.objects.count()
+        # Too long a span, then a year of daily slots (past the item cap)
+        for start, end in [('9999-01-01', '9999-12-31'), ('2030-01-01', '9990-01-01'), ('2030-01-01', '2030-12-31')]:
+            response = self.client.post('/api/bookings/bulk/', {'recurrence': {**rule, 'start_date': start, 'end_date': end}}, format='json')
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(Booking.objects.count(), before)
+
+        # The last day of the calendar doesn't overflow the series
+        last = {**rule, 'start_date': '9999-12-25', 'end_date': '9999-12-31', 'interval': 5}
+        results = self.client.post('/api/bookings/bulk/', {'recurrence': last}, format='json').json()['results']
+        self.assertEqual([r['booking_date'] for r in results], ['9999-12-25', '9999-12-30'])
+
+class BatchStatusTests(APITestCase):
+    def setUp(self):
+        student = User.objects.create_user('student@example.com', 'Student')
+        lab = Resource.objects.create(name='Lab', type='Lab', capacity=20)
+        day = datetime.date(2030, 1, 7)
+        self.approved = Booking.objects.create(user=student, resource=lab, booking_date=day, time_slot=Booking.TIME_SLOTS[0], status='APPROVED')
+        self.clashing = Booking.objects.create(user=student, resource=lab, booking_date=day, time_slot='09:30 AM - 10:30 AM')
+        self.free = Booking.objects.create(user=student, resource=lab, booking_date=day, time_slot=Booking.TIME_SLOTS[2])
+        # Overlaps self.free, so only one of the two can be approved
+        self.rival = Booking.objects.create(user=student, resource=lab, booking_date=day, time_slot='11:30 AM - 01:30 PM')
+        self.client.force_authenticate(User.objects.create_user('staff@example.com', 'Staff', role='STAFF'))
+
+    def batch(self, ids, new_status='APPROVED'):
+        return self.client.patch('/api/bookings/batch_status/', {'ids': ids, 'status': new_status}, format='json')
+
+    def test_per_id_results(self):
+        response = self.batch([self.clashing.pk, self.free.pk, self.rival.pk, 9999])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(r['id'], r['status']) for r in response.json()['results']], [
+            (self.clashing.pk, 'conflict'), (self.free.pk, 'updated'), (self.rival.pk, 'conflict'), (9999, 'not_found'),
+        ])
+        self.assertEqual(
+            dict(Booking.objects.values_list('id', 'status')),
+            {self.approved.pk: 'APPROVED', self.clashing.pk: 'PENDING', self.free.pk: 'APPROVED', self.rival.pk: 'PENDING'},
+        )
+
+    def test_nothing_updated_is_a_conflict(self):
+        response = self.batch([self.clashing.pk])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['results'][0]['status'], 'conflict')
+        # Rejecting never clashes
+        self.assertEqual(self.batch([self.clashing.pk], 'REJECTED').status_code, 200)
+
+    def test_id_cap_and_permissions(self):
+        self.assertEqual(self.batch(list(range(1, 502))).status_code, 400)
+        self.assertEqual(self.batch(list(range(1, 501))).status_code, 200)
+        self.client.force_authenticate(User.objects.get(role='STUDENT'))
+        self.assertEqual(self.batch([self.free.pk]).status_code, 403)
+
+
+class ResourceCacheTests(APITestCase):
+    def test_reads_are_cached_until_a_resource_write(self):
+        cache.clear()
+        lab = Resource.objects.create(name='Lab', type='Lab', capacity=20)
+        self.client.force_authenticate(User.objects.create_user('staff@example.com', 'Staff', role='STAFF'))
+
+        for url in ('/api/resources/', f'/api/resources/{lab.pk}/'):
+            self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+            with self.assertNumQueries(0):
+                self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/resources/{lab.pk}/', {'name': 'Chemistry Lab'})
+        response = self.client.get('/api/resources/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()[0]['name'], 'Chemistry Lab')
+
+
+class ConditionalListTests(APITestCase):
+    def test_etag_revalidation(self):
+        cache.clear()
+        student = User.objects.create_user('student@example.com', 'Student')
+        lab = Resource.objects.create(name='Lab', type='Lab', capacity=20)
+        Booking.objects.create(user=student, resource=lab, booking_date=datetime.date(2030, 1, 7), time_slot=Booking.TIME_SLOTS[0])
+        self.client.force_authenticate(student)
+
+        response = self.client.get('/api/bookings/')
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/bookings/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Only the ETag is a validator
+        self.assertEqual(self.client.get('/api/bookings/', HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT').status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(user=student, resource=lab, booking_date=datetime.date(2030, 1, 7), time_slot=Booking.TIME_SLOTS[1])
+        response = self.client.get('/api/bookings/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class ClaimsRevocationTests(APITestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('staff@example.com', 'Staff', role='STAFF')
+        self.token = CustomTokenObtainPairSerializer.get_token(self.staff).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+    def test_cached_state_costs_no_queries(self):
+        auth = ClaimsJWTAuthentication()
+        cache.clear()
+        with self.assertNumQueries(1):
+            auth.get_user(self.token)
+        with self.assertNumQueries(0):
+            self.assertEqual(auth.get_user(self.token).role, 'STAFF')
+
+    def test_demotion_seen_by_a_fresh_cache(self):
+        self.assertEqual(self.client.get('/api/users/').status_code, 200)
+        User.objects.filter(pk=self.staff.pk).update(role='STUDENT') # no signal, as on another worker
+        cache.clear()
+        self.assertEqual(self.client.get('/api/users/').status_code, 401)
+
+    def test_deletion_seen_by_a_fresh_cache(self):
+        self.staff.delete()
+        cache.clear()
+        response = self.client.get('/api/users/')
+        self.assertEqual((response.status_code, response.json()['code']), (401, 'user_not_found'))
+
+
+class TimeSlotTests(APITestCase):
+    def test_parse_time_slot(self):
+        cases = {
+            '09:00 AM - 10:00 AM': (datetime.time(9), datetime.time(10)),
+            '10AM-12PM': (datetime.time(10), datetime.time(12)),
+            '11-1PM': (datetime.time(11), datetime.time(13)),
+            '14:00-15:30': (datetime.time(14), datetime.time(15, 30)),
+            '5PM-3PM': None,
+            'morning': None,
+        }
+        for text, expected in cases.items():
+            self.assertEqual(parse_time_slot(text), expected, text)
+
+    def test_overlapping_slot_is_rejected(self):
+        student = User.objects.create_user('student@example.com', 'Student')
+        resource = Resource.objects.create(name='Lab', type='Lab', capacity=20)
+        Booking.objects.create(user=student, resource=resource, booking_date=datetime.date(2026, 1, 5), time_slot='10AM-12PM')
+        self.client.force_authenticate(student)
+
+        response = self.client.post('/api/bookings/', {
+            'resource': resource.id, 'booking_date': '2026-01-05', 'time_slot': '11:00 AM - 12:00 PM',
+        })
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/api/bookings/', {
+            'resource': resource.id, 'booking_date': '2026-01-05', 'time_slot': '12:00 PM - 01:00 PM',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['start_time'], '12:00:00')
+
+    def test_unparseable_slot_clears_interval(self):
+        student = User.objects.create_user('student@example.com', 'Student')
+        resource = Resource.objects.create(name='Lab', type='Lab', capacity=20)
+        booking = Booking.objects.create(user=student, resource=resource, booking_date=datetime.date(2026, 1, 5), time_slot='10AM-12PM')
+        booking.time_slot = 'morning'
+        booking.save()
+        booking.refresh_from_db()
+        self.assertEqual((booking.start_time, booking.end_time), (None, None))
+
+
+    def test_legacy_slot_survives_partial_updates(self):
+        student = User.objects.create_user('student@example.com', 'Student')
+        resource = Resource.objects.create(name='Lab', type='Lab', capacity=20)
+        legacy = Booking.objects.create(user=student, resource=resource, booking_date=datetime.date(2026, 1, 5), time_slot='morning')
+        Booking.objects.create(user=student, resource=resource, booking_date=datetime.date(2026, 1, 7), time_slot='morning')
+        self.client.force_authenticate(student)
+
+        url = f'/api/bookings/{legacy.pk}/'
+        self.assertEqual(self.client.patch(url, {'booking_date': '2026-01-06'}).status_code, 200)
+        # Compared with other bookings by slot text
+        self.assertEqual(self.client.patch(url, {'booking_date': '2026-01-07'}).status_code, 400)
+        self.assertEqual(self.client.patch(url, {'time_slot': 'afternoon'}).status_code, 400)
+        legacy.refresh_from_db()
+        self.assertEqual((legacy.booking_date, legacy.time_slot), (datetime.date(2026, 1, 6), 'morning'))
+
+class ActivityRecorderTests(APITestCase):
+    def test_flush_replays_events_in_order(self):
+        user = User.objects.create_user('student@example.com', 'Student')
+        start = timezone.now()
+        earlier = UserActivity.objects.create(user=user, login_time=start - datetime.timedelta(days=1))
+
+        recorder = ActivityRecorder(background=False)
+        recorder.record_login(user.id, start)
+        recorder.record_logout(user.id, start + datetime.timedelta(minutes=1))
+        recorder.record_logout(user.id, start + datetime.timedelta(minutes=2))
+        recorder.record_login(user.id, start + datetime.timedelta(minutes=3))
+        # Nothing is written until the buffer is flushed
+        self.assertEqual(UserActivity.objects.count(), 1)
+        self.assertEqual(recorder.flush(), 4)
+
+        sessions = list(UserActivity.objects.order_by('login_time').values_list('id', 'logout_time'))
+        self.assertEqual(sessions[0], (earlier.id, start + datetime.timedelta(minutes=2)))
+        self.assertEqual(sessions[1][1], start + datetime.timedelta(minutes=1))
+        self.assertIsNone(sessions[2][1])
+
+
+class ActivityRetentionTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('student@example.com', 'Student')
+        today = timezone.localdate()
+        self.days = [today - datetime.timedelta(days=n) for n in (3, 2, 1)]
+
+    def login(self, day, minutes=None):
+        login_time = timezone.make_aware(datetime.datetime.combine(day, datetime.time(12)))
+        logout_time = login_time + datetime.timedelta(minutes=minutes) if minutes is not None else None
+        return UserActivity.objects.create(user=self.user, login_time=login_time, logout_time=logout_time)
+
+    def rollups(self):
+        return {
+            row.date: (row.session_count, row.open_sessions, row.total_duration_seconds)
+            for row in DailySessionRollup.objects.all()
+        }
+
+    def test_rollup_counts_and_late_logouts(self):
+        self.login(self.days[1], 60)
+        still_open = self.login(self.days[1])
+        self.login(self.days[2], 30)
+        self.login(timezone.localdate(), 5) # today isn't complete yet
+
+        self.assertEqual(rollup_sessions(), 2)
+        self.assertEqual(self.rollups(), {self.days[1]: (2, 1, 3600), self.days[2]: (1, 0, 1800)})
+
+        # Closed since the last run, so its day is rolled up again
+        UserActivity.objects.filter(pk=still_open.pk).update(logout_time=still_open.login_time + datetime.timedelta(minutes=10))
+        self.assertEqual(rollup_sessions(), 1)
+        self.assertEqual(self.rollups(), {self.days[1]: (2, 0, 4200), self.days[2]: (1, 0, 1800)})
+        self.assertEqual(rollup_sessions(), 0)
+
+    def test_archive_moves_rows(self):
+        old = self.login(self.days[0], 10)
+        kept = self.login(self.days[2], 10)
+        cutoff = kept.login_time - datetime.timedelta(hours=1)
+
+        self.assertEqual(archive_activity(cutoff, batch_size=1), 1)
+        self.assertEqual(list(UserActivity.objects.values_list('id', flat=True)), [kept.pk])
+        self.assertEqual(UserActivityArchive.objects.get().id, old.pk)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'activity.jsonl.gz')
+            self.assertEqual(archive_activity(kept.login_time + datetime.timedelta(seconds=1), output=path), 1)
+            with gzip.open(path, 'rt') as archived:
+                self.assertEqual([json.loads(line)['id'] for line in archived], [kept.pk])
+        self.assertFalse(UserActivity.objects.exists())
+
+    def test_command_rolls_up_then_archives(self):
+        for day in self.days:
+            self.login(day, 10)
+        out = io.StringIO()
+        call_command('archive_user_activity', days=2, stdout=out)
+        self.assertIn('Wrote 3 daily session rollups', out.getvalue())
+        self.assertEqual(set(self.rollups()), set(self.days))
+        # Logged in three days ago, before the two-day window
+        self.assertEqual(UserActivity.objects.count(), 2)
+        self.assertEqual(UserActivityArchive.objects.count(), 1)
+
+
+class FilterIndexTests(APITestCase):
+    """Each common filter combination should be answered from an index."""
+
+    def assertUsesIndex(self, filterset_class, params, fields):
+        model = filterset_class._meta.model
+        index = next(index for index in model._meta.indexes if index.fields == fields)
+        filterset = filterset_class(params, queryset=model.objects.all())
+        self.assertTrue(filterset.is_valid(), filterset.errors)
+        plan = filterset.qs.explain()
+        self.assertIn(index.name, plan, f"{params} doesn't use the {fields} index:\n{plan}")
+
+    def test_filters_use_indexes(self):
+        user = User.objects.create_user('student@example.com', 'Student')
+        resource = Resource.objects.create(name='Lab', type='Lab', capacity=20)
+        self.assertUsesIndex(BookingFilter, {'status': 'PENDING', 'booking_date__gte': '2026-01-01'}, ['status', 'booking_date'])
+        self.assertUsesIndex(BookingFilter, {'user': user.id, 'booking_date__lte': '2026-01-31'}, ['user', 'booking_date'])
+        self.assertUsesIndex(BookingFilter, {'resource': resource.id, 'booking_date__gte': '2026-01-01'}, ['resource', 'booking_date', 'start_time'])
+        self.assertUsesIndex(ResourceFilter, {'type': 'Lab', 'capacity__gte': '20'}, ['type', 'capacity'])
+        self.assertUsesIndex(UserFilter, {'role': 'STAFF', 'status': 'ACTIVE'}, ['role', 'status'])
+
+    def test_booking_list_filters(self):
+        staff = User.objects.create_user('staff@example.com', 'Staff', role='STAFF')
+        resource = Resource.objects.create(name='Lab', type='Lab', capacity=20)
+        for day in range(1, 5):
+            Booking.objects.create(user=staff, resource=resource, booking_date=datetime.date(2026, 1, day),
+                                   time_slot=Booking.TIME_SLOTS[0], status='APPROVED' if day > 2 else 'PENDING')
+        self.client.force_authenticate(staff)
+        response = self.client.get('/api/bookings/?status=APPROVED&booking_date__lte=2026-01-03')
+        self.assertEqual([row['booking_date'] for row in response.json()], ['2026-01-03'])
+
+
+class ResourceSearchTests(APITestCase):
+    def setUp(self):
+        resource_cache.bump() # the index is per process, start from this test's rows
+        for name, type_, capacity in [('Computer Lab A', 'Lab', 30), ('Physics Lab', 'Lab', 20),
+                                      ('Lecture Hall 101', 'Classroom', 100), ('Labyrinth Room', 'Study Room', 8)]:
+            Resource.objects.create(name=name, type=type_, capacity=capacity)
+
+    def search(self, **params):
+        response = self.client.get('/api/resources/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return [row['name'] for row in response.json()]
+
+    def test_ranking_and_filters(self):
+        self.assertEqual(self.search(q='lab'), ['Labyrinth Room', 'Physics Lab', 'Computer Lab A'])
+        self.assertEqual(self.search(q='comp lab'), ['Computer Lab A'])
+        self.assertEqual(self.search(q='lectre hall'), ['Lecture Hall 101']) # typo
+        self.assertEqual(self.search(q='lab', type='Lab', min_capacity=25), ['Computer Lab A'])
+        self.assertEqual(self.search(q='lab', limit=1), ['Labyrinth Room'])
+        self.assertEqual(self.client.get('/api/resources/search/?limit=x').status_code, 400)
+
+    def test_index_follows_writes(self):
+        self.search(q='lab') # build
+        with self.captureOnCommitCallbacks(execute=True):
+            chemistry = Resource.objects.create(name='Chemistry Lab', type='Lab', capacity=20)
+            Resource.objects.filter(name='Physics Lab').get().delete()
+        version = resource_index.version
+        self.assertEqual(self.search(q='lab', type='Lab'), ['Chemistry Lab', 'Computer Lab A'])
+        self.assertEqual(resource_index.version, version) # applied in place, not rebuilt
+
+        Resource.objects.filter(pk=chemistry.pk).update(name='Biology Lab')
+        resource_cache.bump() # what bulk writes do; forces a rebuild
+        self.assertEqual(self.search(q='bio'), ['Biology Lab'])
+
+    @override_settings(RESOURCE_SEARCH_BACKEND='database')
+    def test_database_backend(self):
+        self.assertEqual(self.search(q='lab'), ['Labyrinth Room'])
+        self.assertEqual(self.search(q='', type='Lab'), ['Computer Lab A', 'Physics Lab'])
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(APITestCase):
+    # The runner sets up test databases only for aliases it knows about;
+    # without a configured replica, setUpClass stands one up
+    databases = {'default', 'replica'} if 'replica' in settings.DATABASES else {'default'}
+
+    @classmethod
+    def setUpClass(cls):
+        if 'replica' not in connections.settings:
+            connections.settings['replica'] = connections.configure_settings({
+                'default': connections.settings['default'],
+                'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
+            })['replica']
+            call_command('migrate', database='replica', verbosity=0)
+            cls.addClassCleanup(cls._drop_replica)
+            cls.databases = {'default', 'replica'}
+        super().setUpClass()
+
+    @staticmethod
+    def _drop_replica():
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+
+    def setUp(self):
+        self.student = User.objects.create_user('student@example.com', 'Student')
+        self.resource = Resource.objects.create(name='Lab', type='Lab', capacity=20)
+        # The stand-in replica isn't replicated to; give it its own, older rows
+        User.objects.using('replica').create(id=self.student.id, email='student@example.com', name='Old Name')
+        Resource.objects.using('replica').create(id=self.resource.id, name='Old Lab', type='Lab', capacity=20)
+        Booking.objects.using('replica').create(user_id=self.student.id, resource_id=self.resource.id,
+                                                booking_date=datetime.date(2026, 1, 1), time_slot=Booking.TIME_SLOTS[0])
+        token = CustomTokenObtainPairSerializer.get_token(self.student).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def profile_name(self):
+        return self.client.get(f'/api/users/{self.student.id}/').json()['name']
+
+    def test_reads_use_replica_until_the_user_writes(self):
+        self.assertEqual(self.profile_name(), 'Old Name')
+        response = self.client.post('/api/bookings/', {
+            'resource': self.resource.id, 'booking_date': '2026-02-01', 'time_slot': Booking.TIME_SLOTS[0],
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.profile_name(), 'Student') # pinned to the primary
+
+        del self.client.cookies[PIN_COOKIE]
+        self.assertEqual(self.profile_name(), 'Old Name')
+
+    def test_cached_and_conditional_reads_use_primary(self):
+        # Each of these is stored or validated under the current version
+        self.assertEqual(self.client.get('/api/bookings/').json(), [])
+        self.assertEqual(self.client.get('/api/resources/').json()[0]['name'], 'Lab')
+        self.assertEqual(self.client.get('/api/resources/search/', {'q': 'lab'}).json()[0]['name'], 'Lab')
+        self.assertEqual(self.client.get('/api/availability/', {'from': '2026-01-01'}).json()['resources'][0]['taken'], {})
+        self.assertEqual(self.client.get('/api/stats/').json()['bookings']['total'], 0)
+        self.assertEqual(self.profile_name(), 'Old Name') # while plain reads still use the replica
+
+    def test_falls_back_when_replica_is_down(self):
+        router = next(router for router in db_router.routers if isinstance(router, ReplicaRouter))
+        with mock.patch.object(connections['replica'], 'ensure_connection', side_effect=OperationalError):
+            self.assertEqual(self.profile_name(), 'Student')
+        self.assertEqual(self.profile_name(), 'Student') # still marked down
+        router._down_until.clear()
+        self.assertEqual(self.profile_name(), 'Old Name')
+
+
+class MetricsTests(APITestCase):
+    def setUp(self):
+        metrics_registry.reset()
+        self.staff = User.objects.create_user('staff@example.com', 'Staff', role='STAFF')
+        resource = Resource.objects.create(name='Lab', type='Lab', capacity=20)
+        Booking.objects.create(user=self.staff, resource=resource, booking_date=datetime.date(2026, 1, 1), time_slot=Booking.TIME_SLOTS[0])
+        token = CustomTokenObtainPairSerializer.get_token(self.staff).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_server_timing_and_metrics(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/bookings/')
+        queries = len(ctx) # the query log is reset by the next request
+        timing = dict(part.split(';', 1) for part in response['Server-Timing'].split(', '))
+        self.assertEqual(set(timing), {'db', 'serialize', 'auth', 'total'})
+        self.assertIn(f'desc="{queries} queries"', timing['db'])
+
+        text = self.client.get('/api/metrics/').content.decode()
+        labels = 'route="booking-list",method="GET",status="2xx"'
+        self.assertIn(f'campus_request_duration_seconds_count{{{labels}}} 1', text)
+        self.assertIn(f'campus_db_queries_total{{{labels}}} {queries}', text)
+        self.assertIn(f'campus_serializer_seconds_total{{{labels}}}', text)
+
+    def test_metrics_are_staff_only(self):
+        self.client.credentials()
+        self.client.force_authenticate(User.objects.create_user('student@example.com', 'Student'))
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+
+
+class IdempotencyTests(APITestCase):
+    def setUp(self):
+        self.student = User.objects.create_user('student@example.com', 'Student')
+        self.lab = Resource.objects.create(name='Lab', type='Lab', capacity=20)
+        self.booking = {'resource': self.lab.pk, 'booking_date': '2030-01-07', 'time_slot': Booking.TIME_SLOTS[0]}
+        self.client.force_authenticate(self.student)
+
+    def test_retried_create_is_replayed(self):
+        first = self.client.post('/api/bookings/', self.booking, HTTP_IDEMPOTENCY_KEY='attempt-1')
+        with self.assertNumQueries(1):
+            retry = self.client.post('/api/bookings/', self.booking, HTTP_IDEMPOTENCY_KEY='attempt-1')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual((retry.status_code, retry.json()), (201, first.json()))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Booking.objects.count(), 1)
+
+        changed = self.client.post('/api/bookings/', {**self.booking, 'time_slot': Booking.TIME_SLOTS[1]}, HTTP_IDEMPOTENCY_KEY='attempt-1')
+        self.assertEqual(changed.status_code, 422)
+        # Keys are per user
+        self.client.force_authenticate(User.objects.create_user('other@example.com', 'Other'))
+        self.assertEqual(self.client.post('/api/bookings/', self.booking, HTTP_IDEMPOTENCY_KEY='attempt-1').status_code, 400)
+
+    def in_flight(self, **fields):
+        # As left by a first attempt still running, possibly on another worker
+        first = self.client.post('/api/bookings/', self.booking, HTTP_IDEMPOTENCY_KEY='attempt-1')
+        Booking.objects.filter(pk=first.json()['id']).delete()
+        IdempotencyKey.objects.update(status_code=None, response=None, **fields)
+
+    def test_duplicate_in_flight_is_short_circuited(self):
+        self.in_flight()
+        with self.assertNumQueries(1):
+            response = self.client.post('/api/bookings/', self.booking, HTTP_IDEMPOTENCY_KEY='attempt-1')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertFalse(Booking.objects.exists())
+
+    def test_abandoned_and_expired_keys_are_reclaimed(self):
+        self.in_flight(created_at=timezone.now() - datetime.timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT + 1))
+        response = self.client.post('/api/bookings/', self.booking, HTTP_IDEMPOTENCY_KEY='attempt-1')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(IdempotencyKey.objects.get().status_code, 201)
+
+        IdempotencyKey.objects.update(created_at=timezone.now() - datetime.timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL + 1))
+        retry = self.client.post('/api/bookings/', self.booking, HTTP_IDEMPOTENCY_KEY='attempt-1')
+        self.assertEqual(retry.status_code, 400) # ran again and hit its own booking
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+    def test_status_update_replay(self):
+        booking = Booking.objects.create(user=self.student, resource=self.lab, booking_date=datetime.date(2030, 1, 7), time_slot=Booking.TIME_SLOTS[0])
+        self.client.force_authenticate(User.objects.create_user('staff@example.com', 'Staff', role='STAFF'))
+        url = f'/api/bookings/{booking.pk}/update_status/'
+        self.assertEqual(self.client.patch(url, {'status': 'APPROVED'}, HTTP_IDEMPOTENCY_KEY='approve-1').status_code, 200)
+        Booking.objects.filter(pk=booking.pk).update(status='PENDING')
+        retry = self.client.patch(url, {'status': 'APPROVED'}, HTTP_IDEMPOTENCY_KEY='approve-1')
+        self.assertEqual((retry.status_code, retry['Idempotent-Replayed']), (200, 'true'))
+        self.assertEqual(Booking.objects.get(pk=booking.pk).status, 'PENDING')
+
+
+class ConflictAlternativeTests(APITestCase):
+    def test_conflict_suggests_ranked_alternatives(self):
+        student = User.objects.create_user('student@example.com', 'Student')
+        lab = Resource.objects.create(name='Lab A', type='Lab', capacity=20)
+        bigger = Resource.objects.create(name='Lab B', type='Lab', capacity=30)
+        Resource.objects.create(name='Lab C', type='Lab', capacity=10)
+        Resource.objects.create(name='Hall', type='Event Hall', capacity=200)
+        day = timezone.localdate() + datetime.timedelta(days=7)
+        for slot in Booking.TIME_SLOTS[:2]:
+            Booking.objects.create(user=student, resource=lab, booking_date=day, time_slot=slot, status='APPROVED')
+
+        self.client.force_authenticate(student)
+        # Resource lookup, conflict check, then one availability grid
+        with self.assertNumQueries(4):
+            response = self.client.post('/api/bookings/', {'resource': lab.pk, 'booking_date': day, 'time_slot': Booking.TIME_SLOTS[0]})
+        self.assertEqual(response.status_code, 400)
+        body = response.json()
+        self.assertIn('non_field_errors', body)
+        suggested = [(a['resource'], a['booking_date'], a['time_slot'], a['reason']) for a in body['alternatives']]
+        self.assertEqual(suggested[:3], [
+            (lab.pk, day.isoformat(), Booking.TIME_SLOTS[2], 'nearby_slot'),
+            (bigger.pk, day.isoformat(), Booking.TIME_SLOTS[0], 'similar_resource'),
+            (lab.pk, day.isoformat(), Booking.TIME_SLOTS[3], 'nearby_slot'),
+        ])
+        self.assertEqual(len(suggested), 5)
+        self.assertTrue({resource_id for resource_id, *_ in suggested} <= {lab.pk, bigger.pk})
+
+        # Suggestions are bookable as-is
+        alternative = body['alternatives'][0]
+        self.assertEqual(self.client.post('/api/bookings/', {key: alternative[key] for key in ('resource', 'booking_date', 'time_slot')}).status_code, 201)
+
+
+    def test_started_slots_are_not_offered(self):
+        lab = Resource.objects.create(name='Lab A', type='Lab', capacity=20)
+        Resource.objects.create(name='Lab B', type='Lab', capacity=20)
+        now = timezone.make_aware(datetime.datetime(2030, 1, 7, 10, 30))
+        with mock.patch('django.utils.timezone.now', return_value=now):
+            alternatives = suggest_alternatives(lab, now.date(), *parse_time_slot(Booking.TIME_SLOTS[1]))
+        today = [a for a in alternatives if a['booking_date'] == '2030-01-07']
+        self.assertTrue(today)
+        self.assertEqual({a['reason'] for a in today}, {'nearby_slot'}) # not Lab B, its 10:00 slot has begun
+        self.assertTrue(all(a['time_slot'] in Booking.TIME_SLOTS[2:] for a in today))
+
+    def test_other_validation_errors_offer_no_alternatives(self):
+        student = User.objects.create_user('student@example.com', 'Student')
+        lab = Resource.objects.create(name='Lab A', type='Lab', capacity=20)
+
+        def closed(attrs):
+            raise ValidationError("Bookings are closed.")
+
+        self.client.force_authenticate(student)
+        with mock.patch.object(BookingSerializer, 'get_validators', lambda serializer: [closed]):
+            response = self.client.post('/api/bookings/', {'resource': lab.pk, 'booking_date': '2030-01-07', 'time_slot': Booking.TIME_SLOTS[0]})
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('alternatives', response.json())
+
+class UtilizationTests(APITestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('staff@example.com', 'Staff', role='STAFF')
+        self.small = Resource.objects.create(name='Small Lab', type='Lab', capacity=10)
+        self.large = Resource.objects.create(name='Large Lab', type='Lab', capacity=30)
+        self.monday = datetime.date(2030, 1, 7)
+        self.client.force_authenticate(self.staff)
+
+    def usage(self):
+        return {
+            (row.resource_id, row.date): (row.approved_mask, row.pending_mask)
+            for row in ResourceDailyUsage.objects.all()
+        }
+
+    def test_rollup_without_named_conflict_targets(self):
+        # MySQL's feature set: no ON CONFLICT (resource, date) upserts
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+            for slot in Booking.TIME_SLOTS[:2]:
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = self.client.post('/api/bookings/', {'resource': self.small.pk, 'booking_date': self.monday, 'time_slot': slot})
+                self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.usage(), {(self.small.pk, self.monday): (0, 0b11)})
+
+    def test_rollup_follows_booking_writes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.client.post('/api/bookings/', {'resource': self.small.pk, 'booking_date': self.monday, 'time_slot': Booking.TIME_SLOTS[0]}).json()
+            self.client.post('/api/bookings/bulk/', {'bookings': [
+                {'resource': self.small.pk, 'booking_date': self.monday, 'time_slot': Booking.TIME_SLOTS[1]},
+                {'resource': self.large.pk, 'booking_date': self.monday, 'time_slot': Booking.TIME_SLOTS[1]},
+            ]}, format='json')
+        self.assertEqual(self.usage(), {(self.small.pk, self.monday): (0, 0b11), (self.large.pk, self.monday): (0, 0b10)})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/api/bookings/{first['id']}/update_status/", {'status': 'APPROVED'})
+            large_id = Booking.objects.get(resource=self.large).pk
+            self.client.patch('/api/bookings/batch_status/', {'ids': [large_id], 'status': 'REJECTED'}, format='json')
+        self.assertEqual(self.usage(), {(self.small.pk, self.monday): (0b1, 0b10)})
+
+        # Moving a booking refreshes both the old and the new day
+        tuesday = self.monday + datetime.timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/api/bookings/{first['id']}/", {'booking_date': tuesday})
+        self.assertEqual(self.usage(), {(self.small.pk, self.monday): (0, 0b10), (self.small.pk, tuesday): (0b1, 0)})
+
+        incremental = self.usage()
+        self.assertEqual(backfill_usage(), 2)
+        self.assertEqual(self.usage(), incremental)
+
+    def test_report(self):
+        Booking.objects.create(user=self.staff, resource=self.large, booking_date=self.monday, time_slot=Booking.TIME_SLOTS[0], status='APPROVED')
+        Booking.objects.create(user=self.staff, resource=self.small, booking_date=self.monday, time_slot=Booking.TIME_SLOTS[0], status='PENDING')
+        backfill_usage()
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/analytics/utilization/', {'from': self.monday, 'to': self.monday + datetime.timedelta(days=13)})
+        report = response.json()
+        self.assertEqual(report['days']['Mon'], 2)
+        small, large = report['resources']
+        self.assertEqual(large['heatmap'][0][0], 0.5)
+        self.assertEqual(small['pending'][0][0], 0.5)
+        self.assertEqual(small['utilization'], 0)
+        lab, = report['types']
+        # Capacity-weighted: 30 of 40 seats booked on one of two Mondays
+        self.assertEqual(lab['heatmap'][0][0], 0.375)
+
+        self.assertEqual(self.client.get('/api/analytics/utilization/', {'from': '2030-01-01', 'to': '2031-06-01'}).status_code, 400)
+        self.client.force_authenticate(User.objects.create_user('student@example.com', 'Student'))
+        self.assertEqual(self.client.get('/api/analytics/utilization/').status_code, 403)
+
+
+class UserImportTests(APITestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('staff@example.com', 'Staff', role='STAFF')
+        self.client.force_authenticate(self.staff)
+
+    def test_csv_import_reports_row_errors(self):
+        upload = SimpleUploadedFile('intake.csv', (
+            'name,email,phone,role,password\n'
+            'Ann,ann@example.com,,STUDENT,secret-1\n'
+            'Bob,not-an-email,,,secret-2\n'
+            'Staff Again,staff@example.com,,,\n'
+            'Ann Twin,ann@example.com,,,\n'
+            'Cy,cy@example.com,555,,\n'
+        ).encode())
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/api/users/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 2)
+        self.assertEqual([error['row'] for error in response.json()['errors']], [2, 3, 4])
+        self.assertLessEqual(len(ctx), 4) # uniqueness check + insert (+ savepoint)
+        self.assertTrue(User.objects.get(email='ann@example.com').check_password('secret-1'))
+        self.assertFalse(User.objects.get(email='cy@example.com').has_usable_password())
+
+    def test_emails_are_unique_ignoring_case(self):
+        result = import_users([
+            {'name': 'Staff Again', 'email': 'Staff@Example.com'},
+            {'name': 'Ann', 'email': 'ann@example.com'},
+            {'name': 'Ann Again', 'email': 'ANN@example.com'},
+        ])
+        self.assertEqual(result['created'], 1)
+        self.assertEqual([error['row'] for error in result['errors']], [1, 3])
+
+    def test_rows_taken_after_the_check_are_reported(self):
+        rows = [{'name': 'Staff Again', 'email': 'staff@example.com'}, {'name': 'Dee', 'email': 'dee@example.com'}]
+        # As if the first email was registered between the check and the insert
+        with mock.patch('resources.user_import._taken_emails', return_value=set()):
+            result = import_users(rows)
+        self.assertEqual(result['created'], 1)
+        self.assertEqual([error['row'] for error in result['errors']], [1])
+        self.assertTrue(User.objects.filter(email='dee@example.com').exists())
+
+    def test_one_hash_pool_per_import(self):
+        rows = [{'name': f'User {i}', 'email': f'user{i}@example.com'} for i in range(20)]
+        # Threads stand in for the spawned processes
+        with mock.patch('resources.user_import.hash_pool', side_effect=lambda workers: ThreadPoolExecutor(2)) as hash_pool:
+            result = import_users(rows, workers=2, chunk_size=8)
+        self.assertEqual(result, {'created': 20, 'errors': []})
+        self.assertEqual(hash_pool.call_count, 1)
+
+    def test_parallel_hashing(self):
+        passwords = [f'password-{i}' for i in range(10)]
+        hashes = hash_passwords(passwords, workers=2)
+        self.assertTrue(all(check_password(password, hashed) for password, hashed in zip(passwords, hashes)))
+
+    def test_json_body_and_permissions(self):
+        response = self.client.post('/api/users/import/?dry_run=true', [{'name': 'Dee', 'email': 'dee@example.com'}], format='json')
+        self.assertEqual(response.json(), {'created': 1, 'errors': []})
+        self.assertFalse(User.objects.filter(email='dee@example.com').exists())
+
+        self.client.force_authenticate(User.objects.create_user('student@example.com', 'Student'))
+        self.assertEqual(self.client.post('/api/users/import/', [], format='json').status_code, 403)
+
+
+class ExportTests(APITestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('staff@example.com', 'Staff', role='STAFF')
+        self.student = User.objects.create_user('student@example.com', 'Student')
+        resource = Resource.objects.create(name='Lab', type='Lab', capacity=20)
+        for day in range(1, 6):
+            Booking.objects.create(user=self.student, resource=resource, booking_date=datetime.date(2026, 1, day),
+                                   time_slot=Booking.TIME_SLOTS[0], status='APPROVED' if day % 2 else 'PENDING')
+            UserActivity.objects.create(user=self.student)
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_booking_csv_export(self):
+        self.client.force_authenticate(self.staff)
+        response = self.client.get('/api/bookings/export/?from=2026-01-02&to=2026-01-05&status=APPROVED')
+        lines = self.read(response).splitlines()
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertTrue(lines[0].startswith('id,user_email,'))
+        self.assertEqual([line.split(',')[5] for line in lines[1:]], ['2026-01-03', '2026-01-05'])
+
+    def test_csv_cells_cannot_be_formulas(self):
+        User.objects.filter(pk=self.student.pk).update(name='=HYPERLINK("http://example.com")')
+        self.client.force_authenticate(self.staff)
+        rows = list(csv.DictReader(io.StringIO(self.read(self.client.get('/api/bookings/export/')))))
+        self.assertEqual(rows[0]['user_name'], '\'=HYPERLINK("http://example.com")')
+        self.assertEqual(rows[0]['booking_date'], '2026-01-01')
+
+    def test_activity_ndjson_export(self):
+        self.client.force_authenticate(self.staff)
+        response = self.client.get('/api/user-activity/export/?format=ndjson&status=open')
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['user_email'], 'student@example.com')
+
+    def test_export_is_chunked(self):
+        with CaptureQueriesContext(connection) as ctx:
+            rows = list(booking_rows(Booking.objects.all(), chunk_size=2))
+        self.assertEqual([row['id'] for row in rows], sorted(row['id'] for row in rows))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(len(ctx), 3)
+
+    def test_students_cannot_export(self):
+        self.client.force_authenticate(self.student)
+        self.assertEqual(self.client.get('/api/bookings/export/').status_code, 403)
+        self.assertEqual(self.client.get('/api/bookings/export/?format=ndjson').status_code, 403)
+
+
+class BookingEventTests(APITestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('staff@example.com', 'Staff', role='STAFF')
+        self.student = User.objects.create_user('student@example.com', 'Student')
+        self.other = User.objects.create_user('other@example.com', 'Other')
+        self.resource = Resource.objects.create(name='Lab', type='Lab', capacity=20)
+
+    def token(self, user):
+        return str(CustomTokenObtainPairSerializer.get_token(user).access_token)
+
+    async def next_event(self, content):
+        while True:
+            chunk = await asyncio.wait_for(anext(content), timeout=1)
+            chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+            if chunk.startswith('event:'):
+                return json.loads(chunk.split('data: ', 1)[1])
+
+    async def test_stream_receives_own_status_changes(self):
+        booking = await Booking.objects.acreate(
+            user=self.student, resource=self.resource, booking_date=datetime.date(2026, 1, 5), time_slot=Booking.TIME_SLOTS[0])
+        other = await Booking.objects.acreate(
+            user=self.other, resource=self.resource, booking_date=datetime.date(2026, 1, 6), time_slot=Booking.TIME_SLOTS[0])
+        response = await self.async_client.get(f'/api/events/bookings/?token={self.token(self.student)}')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = aiter(response.streaming_content)
+        await anext(content) # retry hint, sent once the subscription exists
+
+        def approve(booking_id):
+            self.client.force_authenticate(self.staff)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.patch(f'/api/bookings/{booking_id}/update_status/', {'status': 'APPROVED'})
+
+        await sync_to_async(approve)(other.id) # someone else's booking is filtered out
+        await sync_to_async(approve)(booking.id)
+        event = await self.next_event(content)
+        self.assertEqual((event['type'], event['id'], event['status']), ('booking.status', booking.id, 'APPROVED'))
+        await content.aclose()
+
+    def test_stream_requires_token(self):
+        self.assertEqual(self.client.get('/api/events/bookings/').status_code, 401)
+        self.assertEqual(self.client.get('/api/events/bookings/?token=bad').status_code, 401)
+
+
+class AsyncReadTests(APITestCase):
+    def setUp(self):
+        self.student = User.objects.create_user('student@example.com', 'Student')
+        self.resource = Resource.objects.create(name='Lab', type='Lab', capacity=20)
+        for day in range(1, 4):
+            Booking.objects.create(user=self.student, resource=self.resource,
+                                   booking_date=datetime.date(2026, 1, day), time_slot=Booking.TIME_SLOTS[0])
+        self.headers = {'authorization': f'Bearer {CustomTokenObtainPairSerializer.get_token(self.student).access_token}'}
+        self.client.force_authenticate(self.student)
+
+    def test_same_payload_as_sync_endpoints(self):
+        for sync_url, async_url in [
+            ('/api/resources/', '/api/async/resources/'),
+            ('/api/bookings/', '/api/async/bookings/'),
+            ('/api/availability/?from=2026-01-01&to=2026-01-07', '/api/async/availability/?from=2026-01-01&to=2026-01-07'),
+            ('/api/stats/', '/api/async/stats/'),
+        ]:
+            expected = self.client.get(sync_url).json()
+            response = async_to_sync(self.async_client.get)(async_url, headers=self.headers)
+            self.assertEqual(response.status_code, 200, async_url)
+            data = response.json()
+            if isinstance(expected, list):
+                expected, data = (sorted(rows, key=lambda row: row['id']) for rows in (expected, data))
+            self.assertEqual(data, expected, async_url)
+
+    async def test_booking_list_keyset(self):
+        response = await self.async_client.get('/api/async/bookings/?limit=2', headers=self.headers)
+        first = [row['id'] for row in response.json()]
+        response = await self.async_client.get(f'/api/async/bookings/?limit=2&before={first[-1]}', headers=self.headers)
+        second = [row['id'] for row in response.json()]
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertLess(second[0], first[-1])
+
+    async def test_login_required(self):
+        self.assertEqual((await self.async_client.get('/api/async/bookings/')).status_code, 401)
+        self.assertEqual((await self.async_client.get('/api/async/resources/')).status_code, 200)
+
+
+@override_settings(ACTIVITY_BUFFERED=False)
+class BenchmarkTests(APITestCase):
+    def test_generate_and_run(self):
+        counts = generate_data(users=10, resources=3, bookings=40, activity=20, days=5)
+        self.assertEqual(Booking.objects.count(), counts['bookings'])
+        self.assertEqual(UserActivity.objects.count(), 20)
+
+        report = LoadScenario(iterations=3, login_iterations=1).run()
+        self.assertEqual([row['scenario'] for row in report],
+                         ['login', 'bookings_list', 'booking_create', 'availability', 'resource_search', 'approval'])
+        self.assertFalse(any(row['errors'] for row in report))
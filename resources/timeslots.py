@@ -0,0 +1,60 @@
+import datetime
+import re
+
+_TIME = r'(\d{1,2})(?::(\d{2}))?\s*([AaPp]\.?[Mm]\.?)?'
+_SLOT_RE = re.compile(rf'^\s*{_TIME}\s*(?:-|–|to)\s*{_TIME}\s*$')
+
+
+def _to_time(hour, minute, meridiem):
+    hour, minute = int(hour), int(minute or 0)
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem == 'P' else 0)
+    if hour > 23 or minute > 59:
+        return None
+    return datetime.time(hour, minute)
+
+
+def parse_time_slot(value):
+    """
+    Parse a free-text slot such as "09:00 AM - 10:00 AM", "10AM-12PM" or
+    "14:00-15:30" into a (start, end) pair of datetime.time.
+
+    When only the end carries AM/PM ("11-1PM"), the start takes whichever
+    meridiem puts it before the end. Returns None when the text can't be
+    parsed or the slot doesn't end after it starts.
+    """
+    match = _SLOT_RE.match(value or '')
+    if not match:
+        return None
+    start_h, start_m, start_mer, end_h, end_m, end_mer = match.groups()
+    start_mer = start_mer[0].upper() if start_mer else None
+    end_mer = end_mer[0].upper() if end_mer else None
+
+    end = _to_time(end_h, end_m, end_mer)
+    if end is None:
+        return None
+    if start_mer is None and end_mer is not None:
+        start = _to_time(start_h, start_m, end_mer)
+        if start is None or start >= end:
+            start = _to_time(start_h, start_m, 'A' if end_mer == 'P' else 'P')
+    else:
+        start = _to_time(start_h, start_m, start_mer)
+
+    if start is None or start >= end:
+        return None
+    return start, end
+
+
+def slots_clash(slot, start, end, other_slot, other_start, other_end):
+    """
+    True when two bookings on the same resource and day collide: their
+    intervals overlap, or (for legacy rows that couldn't be parsed) their
+    slot text is identical.
+    """
+    if slot == other_slot:
+        return True
+    if None in (start, end, other_start, other_end):
+        return False
+    return start < other_end and other_start < end
@@ -1,14 +1,20 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
+from . import async_views
 from .views import (
     UserViewSet,
     ResourceViewSet,
     BookingViewSet,
     UserActivityViewSet,
-    UserActivityViewSet,
+    SessionRollupViewSet,
     CustomTokenObtainPairView,
-    LogoutView
+    LogoutView,
+    StatsView,
+    AvailabilityView,
+    UtilizationView,
+    MetricsView,
+    booking_events
 )
 
 router = DefaultRouter()
@@ -16,10 +22,22 @@ router.register(r'users', UserViewSet)
 router.register(r'resources', ResourceViewSet)
 router.register(r'bookings', BookingViewSet)
 router.register(r'user-activity', UserActivityViewSet, basename='user-activity')
+router.register(r'user-activity-rollups', SessionRollupViewSet, basename='user-activity-rollups')
 
 urlpatterns = [
     # API endpoints for CRUD operations
     path('', include(router.urls)),
+    path('stats/', StatsView.as_view(), name='stats'),
+    path('availability/', AvailabilityView.as_view(), name='availability'),
+    path('analytics/utilization/', UtilizationView.as_view(), name='utilization'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('events/bookings/', booking_events, name='booking_events'),
+
+    # Async read endpoints for ASGI deployments (see async_views.py)
+    path('async/resources/', async_views.resource_list, name='async_resource_list'),
+    path('async/bookings/', async_views.booking_list, name='async_booking_list'),
+    path('async/availability/', async_views.availability, name='async_availability'),
+    path('async/stats/', async_views.stats, name='async_stats'),
     
     # Authentication endpoints
     path('auth/login/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
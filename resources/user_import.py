@@ -0,0 +1,190 @@
+"""
+Bulk user import: validate every row, check email uniqueness with one query
+per chunk, hash passwords in a process pool and insert with bulk_create.
+Used by UserViewSet's import action and the import_users command.
+
+Emails are compared case-insensitively, as MySQL's default collation does.
+"""
+import contextlib
+import csv
+import io
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from .models import User
+from .serializers import UserImportRowSerializer
+from .signals import users_changed
+
+USER_IMPORT_MAX_ROWS = 10000
+USER_IMPORT_CHUNK_SIZE = 1000
+
+# Below this many passwords, starting a pool costs more than it saves
+_POOL_THRESHOLD = 8
+
+
+_EMAIL_TAKEN = {'email': ["A user with this email already exists."]}
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def parse_rows(content, fmt):
+    """
+    Rows from CSV (header: name,email,phone,role,password) or JSON (a list
+    of objects, or {"users": [...]}). Raises ImportFormatError.
+    """
+    if isinstance(content, bytes):
+        try:
+            content = content.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise ImportFormatError("File must be UTF-8 encoded.")
+    if fmt == 'csv':
+        reader = csv.DictReader(io.StringIO(content))
+        if not reader.fieldnames or not {'name', 'email'} <= set(reader.fieldnames):
+            raise ImportFormatError("CSV needs a header row with at least 'name' and 'email'.")
+        return list(reader)
+    if fmt == 'json':
+        try:
+            data = json.loads(content)
+        except ValueError:
+            raise ImportFormatError("Invalid JSON.")
+        if isinstance(data, dict):
+            data = data.get('users')
+        if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+            raise ImportFormatError("JSON must be a list of user objects or {\"users\": [...]}.")
+        return data
+    raise ImportFormatError("Format must be 'csv' or 'json'.")
+
+
+def _worker_count(workers):
+    return workers or getattr(settings, 'USER_IMPORT_HASH_WORKERS', None) or os.cpu_count()
+
+
+def hash_pool(workers=None):
+    """
+    A process pool for hash_passwords(), to share across calls. Workers are
+    spawned, not forked: imports run inside web requests, where forking
+    would copy the recorder and broker threads' locks in whatever state
+    they happen to be.
+    """
+    # Spawned workers inherit DJANGO_SETTINGS_MODULE but must set Django up
+    return ProcessPoolExecutor(max_workers=_worker_count(workers), mp_context=multiprocessing.get_context('spawn'),
+                               initializer=django.setup)
+
+
+def hash_passwords(passwords, workers=None, pool=None):
+    """
+    make_password() for each entry (None gives an unusable password), in
+    parallel on `pool`, or on a pool of its own.
+    """
+    if len(passwords) < _POOL_THRESHOLD or workers == 1:
+        return [make_password(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (_worker_count(workers) * 4))
+    if pool is not None:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+    with hash_pool(workers) as pool:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def _taken_emails(emails):
+    """
+    The lowercased emails among `emails` that already belong to a user.
+    Matches the functional index on Lower(email).
+    """
+    return set(
+        User.objects.annotate(email_lower=Lower('email'))
+        .filter(email_lower__in={email.lower() for email in emails})
+        .values_list('email_lower', flat=True)
+    )
+
+
+def _create_each(rows, users, errors):
+    """Insert users one at a time, reporting the ones the database rejects."""
+    created = []
+    for (index, data), user in zip(rows, users):
+        try:
+            with transaction.atomic():
+                user.save(force_insert=True)
+        except IntegrityError:
+            errors.append({'row': index, 'email': data['email'], 'errors': _EMAIL_TAKEN})
+        else:
+            created.append(user)
+    return created
+
+
+def import_users(rows, workers=None, chunk_size=USER_IMPORT_CHUNK_SIZE, dry_run=False):
+    """
+    Create users from `rows` (dicts). Returns {'created': n, 'errors': [...]}
+    where each error is {'row': 1-based index, 'email': ..., 'errors': {...}}.
+    Valid rows are created even if others fail.
+    """
+    errors = []
+    valid = []
+    seen = set()
+    for index, row in enumerate(rows, start=1):
+        serializer = UserImportRowSerializer(data=row)
+        if not serializer.is_valid():
+            errors.append({'row': index, 'email': row.get('email'), 'errors': serializer.errors})
+            continue
+        data = serializer.validated_data
+        if data['email'].lower() in seen:
+            errors.append({'row': index, 'email': data['email'], 'errors': {'email': ["Duplicate email in this import."]}})
+            continue
+        seen.add(data['email'].lower())
+        valid.append((index, data))
+
+    created = 0
+    with contextlib.ExitStack() as stack:
+        # One pool for the whole import, started by the first chunk that needs it
+        pool = None
+        for start in range(0, len(valid), chunk_size):
+            chunk = valid[start:start + chunk_size]
+            existing = _taken_emails(data['email'] for _, data in chunk)
+            fresh = []
+            for index, data in chunk:
+                if data['email'].lower() in existing:
+                    errors.append({'row': index, 'email': data['email'], 'errors': _EMAIL_TAKEN})
+                else:
+                    fresh.append((index, data))
+            if dry_run:
+                created += len(fresh)
+                continue
+            if not fresh:
+                continue
+
+            if pool is None and len(fresh) >= _POOL_THRESHOLD and workers != 1:
+                pool = stack.enter_context(hash_pool(workers))
+            hashes = hash_passwords([data.get('password') or None for _, data in fresh], workers, pool)
+            users = [
+                User(
+                    name=data['name'],
+                    email=data['email'],
+                    phone=data.get('phone') or None,
+                    role=data.get('role') or 'STUDENT',
+                    password=password,
+                )
+                for (_, data), password in zip(fresh, hashes)
+            ]
+            try:
+                with transaction.atomic():
+                    User.objects.bulk_create(users)
+            except IntegrityError:
+                # Someone registered one of these emails since the check; find
+                # out which by inserting the chunk row by row
+                users = _create_each(fresh, users, errors)
+            created += len(users)
+
+    if created and not dry_run:
+        # bulk_create skips the post_save signal
+        users_changed()
+    errors.sort(key=lambda error: error['row'])
+    return {'created': created, 'errors': errors}
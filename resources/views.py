@@ -1,65 +1,236 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.response import Response
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.views import TokenObtainPairView
-from .models import User, Resource, Booking, UserActivity
+from .models import User, Resource, Booking, UserActivity, DailySessionRollup
 from .serializers import (
     UserSerializer, ResourceSerializer, BookingSerializer, 
     BookingStatusSerializer, CustomTokenObtainPairSerializer, 
-    UserActivitySerializer
+    UserActivitySerializer, BulkBookingSerializer, BatchStatusSerializer,
+    DailySessionRollupSerializer
 )
 from .permissions import IsStaffOrReadOnly, IsOwnerOrStaff
+from .filters import BookingFilter, ResourceFilter, UserFilter
+from .search import search_resources, SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT
+from .pagination import BookingCursorPagination, UserActivityCursorPagination, SessionRollupCursorPagination
+from .mixins import SparseFieldsViewSetMixin, CachedReadMixin, ConditionalListMixin
+from .cache import resource_cache, booking_versions, user_versions, cache_stats
+from .stats import get_dashboard_stats
+from .activity import activity_recorder
+from .availability import build_availability, suggest_alternatives, AVAILABILITY_MAX_DAYS
+from .analytics import utilization_report, UTILIZATION_MAX_DAYS
+from .exports import booking_rows, activity_rows, export_response, BOOKING_COLUMNS, ACTIVITY_COLUMNS
+from .renderers import CSVRenderer, NDJSONRenderer
+from .events import get_broker, publish_bookings, accepts_for, BOOKING_CREATED, BOOKING_STATUS
+from .authentication import aauthenticate
+from .metrics import registry as metrics_registry
+from .idempotency import idempotent
+from .user_import import parse_rows, import_users, ImportFormatError, USER_IMPORT_MAX_ROWS
 from rest_framework.views import APIView
+from django.db import IntegrityError
+from django.db.models import Count, Sum
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+import asyncio
+import datetime
+import json
+
+
+def parse_export_range(params):
+    """
+    Optional ?from= / ?to= (YYYY-MM-DD, both inclusive) for the export
+    actions. Returns (date_from, date_to), either may be None, or raises
+    ValueError with a message for the client.
+    """
+    bounds = []
+    for name in ('from', 'to'):
+        value = params.get(name)
+        try:
+            parsed = parse_date(value) if value else None
+        except ValueError:
+            parsed = None
+        if value and parsed is None:
+            raise ValueError(f"'{name}' must be a date in YYYY-MM-DD format.")
+        bounds.append(parsed)
+    if bounds[0] and bounds[1] and bounds[1] < bounds[0]:
+        raise ValueError("'to' must not be before 'from'.")
+    return tuple(bounds)
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
     def post(self, request, *args, **kwargs):
-        response = super().post(request, *args, **kwargs)
-        if response.status_code == 200:
-            # Log successful login
-            try:
-                # Get user based on email provided in request
-                email = request.data.get('email')
-                user = User.objects.get(email=email)
-                UserActivity.objects.create(user=user)
-            except User.DoesNotExist:
-                pass # Should not happen if token is generated
-        return response
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0]) from e
+
+        # Log successful login, using the user simplejwt already authenticated.
+        # The write is buffered so it stays off the login path.
+        activity_recorder.record_login(serializer.user.pk)
+        return Response(serializer.validated_data, status=status.HTTP_200_OK)
 
 class LogoutView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request):
+        # Closes the user's most recent open login activity when the buffer is flushed
+        activity_recorder.record_logout(request.user.id, timezone.now())
+        return Response({"detail": "Successfully logged out."}, status=status.HTTP_200_OK)
+
+class StatsView(APIView):
+    """
+    Dashboard counters computed with grouped COUNT queries, scoped to the
+    caller's role, so the dashboard doesn't have to download every table.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        stats = get_dashboard_stats(request.user)
+        if request.user.role == 'STAFF':
+            # Live, not part of the cached counters
+            stats = {**stats, 'cache': cache_stats()}
+        return Response(stats)
+
+class MetricsView(APIView):
+    """
+    Request metrics for this process in the Prometheus text format. Staff
+    only; scrape with a bearer token.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        if request.user.role != 'STAFF':
+            return Response({"detail": "Only staff can read metrics."}, status=status.HTTP_403_FORBIDDEN)
+        cache_families = [
+            (f'campus_cache_{kind}_total', f'Versioned cache {kind} in this process.', 'counter',
+             [({'namespace': namespace}, counts[kind]) for namespace, counts in sorted(cache_stats().items())])
+            for kind in ('hits', 'misses')
+        ]
+        return HttpResponse(metrics_registry.render(cache_families), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+class AvailabilityView(APIView):
+    """
+    Free/taken slot bitmaps per resource for a date range.
+    Query params: from, to (YYYY-MM-DD, defaults to `from`), type (optional).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        try:
+            date_from = parse_date(request.query_params.get('from', ''))
+            date_to = parse_date(request.query_params.get('to', '')) if 'to' in request.query_params else date_from
+        except ValueError:
+            date_from = date_to = None
+        if date_from is None or date_to is None:
+            return Response({"detail": "'from' and 'to' must be dates in YYYY-MM-DD format."}, status=status.HTTP_400_BAD_REQUEST)
+        if date_to < date_from:
+            return Response({"detail": "'to' must not be before 'from'."}, status=status.HTTP_400_BAD_REQUEST)
+        if (date_to - date_from).days >= AVAILABILITY_MAX_DAYS:
+            return Response({"detail": f"Date range cannot exceed {AVAILABILITY_MAX_DAYS} days."}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(build_availability(date_from, date_to, request.query_params.get('type')))
+
+class UtilizationView(APIView):
+    """
+    Weekday x slot occupancy heatmaps per resource and resource type, read
+    from the ResourceDailyUsage rollup. Staff only.
+    Query params: from, to (YYYY-MM-DD, default the four weeks to today), type.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        if request.user.role != 'STAFF':
+            return Response({"detail": "Only staff can view utilization analytics."}, status=status.HTTP_403_FORBIDDEN)
         try:
-            # Find the most recent login activity for this user that hasn't been logged out
-            # We filter by user and null logout_time, getting the latest one created
-            activity = UserActivity.objects.filter(
-                user=request.user, 
-                logout_time__isnull=True
-            ).order_by('-login_time').first()
-
-            if activity:
-                activity.logout_time = timezone.now()
-                activity.save()
-            
-            return Response({"detail": "Successfully logged out."}, status=status.HTTP_200_OK)
-        except Exception as e:
-            return Response({"detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            date_from, date_to = parse_export_range(request.query_params)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        date_to = date_to or max(timezone.localdate(), date_from or timezone.localdate())
+        date_from = date_from or date_to - datetime.timedelta(days=27)
+        if (date_to - date_from).days >= UTILIZATION_MAX_DAYS:
+            return Response({"detail": f"Date range cannot exceed {UTILIZATION_MAX_DAYS} days."}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(utilization_report(date_from, date_to, request.query_params.get('type')))
 
 class UserActivityViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = UserActivity.objects.all()
     serializer_class = UserActivitySerializer
     permission_classes = [permissions.IsAdminUser] # Only Admin/Staff can see logs
+    pagination_class = UserActivityCursorPagination
 
     def get_queryset(self):
         # Optional: Filter by user role if needed, or recent logs
-        return UserActivity.objects.all().order_by('-login_time')
+        # The serializer reads user name/email/role, so join it in up front
+        return UserActivity.objects.select_related('user').order_by('-login_time')
+
+    @action(detail=False, methods=['get'], renderer_classes=[CSVRenderer, NDJSONRenderer])
+    def export(self, request):
+        """
+        Stream the activity log as CSV (default) or ?format=ndjson.
+        Filters: from, to (login date), status (open/closed), role.
+        """
+        try:
+            date_from, date_to = parse_export_range(request.query_params)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-class UserViewSet(viewsets.ModelViewSet):
+        queryset = UserActivity.objects.all()
+        # Compare against day boundaries so the login_time index is usable
+        if date_from:
+            queryset = queryset.filter(login_time__gte=timezone.make_aware(datetime.datetime.combine(date_from, datetime.time.min)))
+        if date_to:
+            day_after = date_to + datetime.timedelta(days=1)
+            queryset = queryset.filter(login_time__lt=timezone.make_aware(datetime.datetime.combine(day_after, datetime.time.min)))
+        session_status = request.query_params.get('status')
+        if session_status not in (None, 'open', 'closed'):
+            return Response({"detail": "'status' must be 'open' or 'closed'."}, status=status.HTTP_400_BAD_REQUEST)
+        if session_status:
+            queryset = queryset.filter(logout_time__isnull=session_status == 'open')
+        if request.query_params.get('role'):
+            queryset = queryset.filter(user__role=request.query_params['role'])
+
+        return export_response(request, activity_rows(queryset), ACTIVITY_COLUMNS, 'user-activity')
+
+class SessionRollupViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Daily per-user session totals for staff reports, read from the rollup
+    table instead of the raw activity log. Filter with ?date__gte=,
+    ?date__lte=, ?role= and ?user=.
+    """
+    queryset = DailySessionRollup.objects.select_related('user')
+    serializer_class = DailySessionRollupSerializer
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = SessionRollupCursorPagination
+    filterset_fields = {
+        'date': ['exact', 'gte', 'lte'],
+        'role': ['exact'],
+        'user': ['exact'],
+    }
+
+    @action(detail=False)
+    def by_role(self, request):
+        """Daily totals per role."""
+        rows = self.filter_queryset(self.get_queryset()).order_by('-date', 'role').values('date', 'role').annotate(
+            users=Count('user'),
+            session_count=Sum('session_count'),
+            open_sessions=Sum('open_sessions'),
+            total_duration_seconds=Sum('total_duration_seconds'),
+        )
+        return Response(list(rows))
+
+class UserViewSet(ConditionalListMixin, SparseFieldsViewSetMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    filterset_class = UserFilter
+    conditional_versions = (user_versions,)
+    conditional_per_user = True # staff see everyone, others only themselves
 
     def get_permissions(self):
         # Allow signup to anyone
@@ -77,10 +248,66 @@ class UserViewSet(viewsets.ModelViewSet):
             return User.objects.all()
         return User.objects.filter(id=self.request.user.id)
 
-class ResourceViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser, JSONParser])
+    def import_users(self, request):
+        """
+        Create many users at once. Staff only. Send a CSV or JSON `file`
+        upload, or a JSON body (a list of users or {"users": [...]}).
+        Add ?dry_run=true to validate without creating anything.
+        """
+        if request.user.role != 'STAFF':
+            return Response({"detail": "Only staff can import users."}, status=status.HTTP_403_FORBIDDEN)
+
+        upload = request.FILES.get('file')
+        try:
+            if upload is not None:
+                fmt = 'json' if upload.name.lower().endswith('.json') else 'csv'
+                rows = parse_rows(upload.read(), fmt)
+            else:
+                rows = parse_rows(json.dumps(request.data), 'json')
+        except ImportFormatError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not rows:
+            return Response({"detail": "No users to import."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > USER_IMPORT_MAX_ROWS:
+            return Response({"detail": f"Cannot import more than {USER_IMPORT_MAX_ROWS} users at once."}, status=status.HTTP_400_BAD_REQUEST)
+
+        dry_run = request.query_params.get('dry_run') in ('1', 'true')
+        result = import_users(rows, dry_run=dry_run)
+        if dry_run:
+            return Response(result)
+        return Response(result, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_400_BAD_REQUEST)
+
+class ResourceViewSet(ConditionalListMixin, CachedReadMixin, SparseFieldsViewSetMixin, viewsets.ModelViewSet):
     queryset = Resource.objects.all()
     serializer_class = ResourceSerializer
+    filterset_class = ResourceFilter
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsStaffOrReadOnly]
+    read_cache = resource_cache # bumped by Resource writes (see signals.py)
+    conditional_versions = (resource_cache,)
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Ranked resources for a typeahead: name prefix matches first, then
+        fuzzy matches. Query params: q, type, min_capacity, status, limit.
+        """
+        params = request.query_params
+        numbers = {}
+        for name, default in (('min_capacity', None), ('limit', SEARCH_DEFAULT_LIMIT)):
+            value = params.get(name)
+            if value is not None and not value.isdigit():
+                return Response({"detail": f"'{name}' must be a non-negative integer."}, status=status.HTTP_400_BAD_REQUEST)
+            numbers[name] = int(value) if value is not None else default
+
+        results = search_resources(
+            params.get('q', ''),
+            resource_type=params.get('type') or None,
+            min_capacity=numbers['min_capacity'],
+            status=params.get('status') or None,
+            limit=min(numbers['limit'], SEARCH_MAX_LIMIT),
+        )
+        return Response(results)
 
     def perform_create(self, serializer):
         # Ensure only staff creates resources
@@ -88,21 +315,47 @@ class ResourceViewSet(viewsets.ModelViewSet):
             raise permissions.PermissionDenied("Only staff can create resources.")
         serializer.save()
 
-class BookingViewSet(viewsets.ModelViewSet):
+class BookingViewSet(ConditionalListMixin, SparseFieldsViewSetMixin, viewsets.ModelViewSet):
     queryset = Booking.objects.all()
     serializer_class = BookingSerializer
+    filterset_class = BookingFilter
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrStaff]
+    pagination_class = BookingCursorPagination
+    # Rows embed resource_details and user_details
+    conditional_versions = (booking_versions, resource_cache, user_versions)
+    sparse_related = {'resource_details': 'resource', 'user_details': 'user'}
+    sparse_always_load = ('user',) # IsOwnerOrStaff compares user_id
 
     def get_queryset(self):
         # Allow all authenticated users to see all bookings
         # This is necessary so Students can see if a resource is 'Booked' by others (Availability Check)
-        return Booking.objects.all()
+        # Nested resource_details/user_details are joined in to avoid a query per row
+        return Booking.objects.select_related('user', 'resource')
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        # As CreateModelMixin.create, but a slot conflict also returns free
+        # alternatives so the client doesn't have to retry blind
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+            self.perform_create(serializer)
+        except ValidationError as e:
+            conflict = getattr(serializer, 'conflict', None)
+            if conflict is None:
+                raise
+            return Response({**e.detail, 'alternatives': suggest_alternatives(*conflict)}, status=status.HTTP_400_BAD_REQUEST)
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
     def perform_create(self, serializer):
         # Automatically assign the logged-in user to the booking
-        serializer.save(user=self.request.user)
+        # request.user may be built from token claims, so assign by id
+        serializer.save(user_id=self.request.user.id)
+        publish_bookings(BOOKING_CREATED, [serializer.instance])
 
     @action(detail=True, methods=['patch'], permission_classes=[permissions.IsAuthenticated])
+    @idempotent
     def update_status(self, request, pk=None):
         """
         Custom endpoint to update booking status.
@@ -115,5 +368,119 @@ class BookingViewSet(viewsets.ModelViewSet):
         serializer = BookingStatusSerializer(booking, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
+            publish_bookings(BOOKING_STATUS, [booking])
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Create a list of bookings, or a recurring series, in one request.
+        Responds 201 if at least one booking was created and 409 otherwise,
+        with a per-item result either way.
+        """
+        serializer = BulkBookingSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            results = serializer.save(user_id=request.user.id)
+        except IntegrityError:
+            # Another request took one of the slots between the check and the insert
+            return Response({"detail": "Some of the requested slots were just booked. Please retry."}, status=status.HTTP_409_CONFLICT)
+
+        publish_bookings(BOOKING_CREATED, [result['id'] for result in results if result['status'] == 'created'])
+        created = any(result['status'] == 'created' for result in results)
+        return Response({"results": results}, status=status.HTTP_201_CREATED if created else status.HTTP_409_CONFLICT)
+
+    @action(detail=False, methods=['patch'], permission_classes=[permissions.IsAuthenticated])
+    def batch_status(self, request):
+        """
+        Approve or reject a list of bookings in one request.
+        Only STAFF/ADMIN can approve or reject. Responds 200 if at least one
+        booking was updated and 409 otherwise, with a result per id either way.
+        """
+        if request.user.role != 'STAFF':
+            return Response({"detail": "Only staff can update booking status."}, status=status.HTTP_403_FORBIDDEN)
+
+        serializer = BatchStatusSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        results = serializer.save()
+        updated = [result['id'] for result in results if result['status'] == 'updated']
+        publish_bookings(BOOKING_STATUS, updated)
+        return Response({"results": results}, status=status.HTTP_200_OK if updated else status.HTTP_409_CONFLICT)
+
+    @action(detail=False, methods=['get'], renderer_classes=[CSVRenderer, NDJSONRenderer])
+    def export(self, request):
+        """
+        Stream bookings as CSV (default) or ?format=ndjson. Staff only.
+        Filters: from, to (booking date), status, resource.
+        """
+        if request.user.role != 'STAFF':
+            return Response({"detail": "Only staff can export bookings."}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            date_from, date_to = parse_export_range(request.query_params)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = Booking.objects.all()
+        if date_from:
+            queryset = queryset.filter(booking_date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(booking_date__lte=date_to)
+        booking_status = request.query_params.get('status')
+        if booking_status:
+            if booking_status not in dict(Booking.STATUS_CHOICES):
+                return Response({"detail": f"Unknown status '{booking_status}'."}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(status=booking_status)
+        resource_id = request.query_params.get('resource')
+        if resource_id:
+            if not resource_id.isdigit():
+                return Response({"detail": "'resource' must be a resource id."}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(resource_id=resource_id)
+
+        return export_response(request, booking_rows(queryset), BOOKING_COLUMNS, 'bookings')
+
+
+async def booking_events(request):
+    """
+    Server-sent events for booking creates and status changes. Staff get
+    every booking, students their own; ?resource=<id> narrows the stream
+    to one resource. Needs the ASGI entry point (see asgi.py).
+    """
+    try:
+        user = await aauthenticate(request, allow_query_token=True)
+    except AuthenticationFailed as e:
+        # InvalidToken carries a dict with the detail and failing token types
+        detail = e.detail if isinstance(e.detail, dict) else {"detail": e.detail}
+        return JsonResponse(detail, status=status.HTTP_401_UNAUTHORIZED)
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=status.HTTP_401_UNAUTHORIZED)
+
+    resource_id = request.GET.get('resource')
+    if resource_id is not None and not resource_id.isdigit():
+        return JsonResponse({"detail": "'resource' must be a resource id."}, status=status.HTTP_400_BAD_REQUEST)
+    accepts = accepts_for(user, int(resource_id) if resource_id else None)
+    keepalive = getattr(settings, 'BOOKING_EVENTS_KEEPALIVE', 15)
+
+    async def stream():
+        broker = get_broker()
+        subscription = broker.subscribe(accepts)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    # Comment line so proxies don't close an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no' # don't let nginx buffer the stream
+    return response